@@ -0,0 +1,169 @@
+"""
+analysis_cache.py
+
+Persistent cache of content analysis results keyed by a digest of the
+analyzed bytes, so vendored files and copied snippets that appear in many
+directories (or in many runs, or under both organizers) are only parsed
+once. Unlike the scan index, which trusts a path's size/mtime/inode, the
+cache is shared by every path with the same content.
+
+Keys are chosen by the caller (content_analysis prefixes the digest with
+the result format and the analyzer's name and version). Entries are evicted
+least recently used first once the stored results exceed a size cap. Uses
+are recorded with a resolution of RECENCY_RESOLUTION seconds and written in
+batches, so cache hits rarely write to the database.
+
+Author: Stewart Geisz
+GitHub: StewartGeisz
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional
+
+# Default cap on the stored analysis results
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+# Eviction trims the cache to this fraction of the cap, so it does not run on every insert
+EVICTION_TARGET = 0.9
+
+# Seconds within which further uses of an entry do not update its recency
+RECENCY_RESOLUTION = 3600.0
+
+# Recency updates collected before they are written
+TOUCH_BATCH = 256
+
+
+def content_digest(buffer, end: int) -> str:
+    """Digest of buffer[:end] plus whether the buffer continues past it.
+
+    buffer may be an mmap; it is hashed through a memoryview without copying.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with memoryview(buffer) as view:
+        with view[:end] as examined:
+            digest.update(examined)
+    digest.update(b'+' if len(buffer) > end else b'')
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    def __init__(self, cache_path: str, max_bytes: int = DEFAULT_CACHE_BYTES,
+                 autocommit: bool = False):
+        self.cache_path = cache_path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # Set if another process still holds the write lock after the busy timeout; reads continue
+        self.read_only = False
+        self.connection = sqlite3.connect(cache_path, check_same_thread=False,
+                                          isolation_level=None if autocommit else '')
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS analyses (
+                digest TEXT PRIMARY KEY,
+                analysis TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS analyses_last_used ON analyses (last_used);
+        """)
+        self.total_bytes = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM analyses").fetchone()[0]
+        self.touched = {}  # Digest -> time of a use not yet written to last_used
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Sent to shard processes by path; each one opens its own connection
+        return {'cache_path': self.cache_path, 'max_bytes': self.max_bytes}
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__init__(state['cache_path'], state['max_bytes'], autocommit=True)
+
+    def _write(self, statement: str, parameters, many: bool = False):
+        """Run a write (executemany if many); the cache is only a cache, so a busy database skips it"""
+        if self.read_only:
+            return
+        try:
+            if many:
+                self.connection.executemany(statement, parameters)
+            else:
+                self.connection.execute(statement, parameters)
+        except sqlite3.OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            self.read_only = True
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        """Return the stored analysis for a content digest and mark it recently used"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT analysis, last_used FROM analyses WHERE digest = ?", (digest,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[1] >= RECENCY_RESOLUTION:
+                self.touched[digest] = now
+                if len(self.touched) >= TOUCH_BATCH:
+                    self._flush_touched()
+        return json.loads(row[0])
+
+    def put(self, digest: str, analysis: Dict[str, Any]):
+        """Store an analysis, evicting the least recently used entries beyond the size cap"""
+        data = json.dumps(analysis)
+        with self.lock:
+            replaced = self.connection.execute(
+                "SELECT size FROM analyses WHERE digest = ?", (digest,)).fetchone()
+            self._write(
+                "INSERT OR REPLACE INTO analyses (digest, analysis, size, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                (digest, data, len(data), time.time())
+            )
+            if self.read_only:
+                return
+            self.touched.pop(digest, None)
+            self.total_bytes += len(data) - (replaced[0] if replaced else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _flush_touched(self):
+        """Write the recorded uses to last_used"""
+        if self.touched:
+            self._write("UPDATE analyses SET last_used = ? WHERE digest = ?",
+                        [(used, digest) for digest, used in self.touched.items()], many=True)
+            self.touched.clear()
+
+    def _evict(self):
+        # Recent uses count, so they are written first
+        self._flush_touched()
+        # Recount first: other processes may have added or evicted entries
+        self.total_bytes = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM analyses").fetchone()[0]
+        excess = self.total_bytes - int(self.max_bytes * EVICTION_TARGET)
+        if excess <= 0 or self.read_only:
+            return
+        evicted = 0
+        oldest = []
+        for digest, size in self.connection.execute(
+                "SELECT digest, size FROM analyses ORDER BY last_used"):
+            if evicted >= excess:
+                break
+            oldest.append((digest,))
+            evicted += size
+        self._write("DELETE FROM analyses WHERE digest = ?", oldest, many=True)
+        if not self.read_only:
+            self.total_bytes -= evicted
+
+    def commit(self):
+        with self.lock:
+            self._flush_touched()
+            self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self._flush_touched()
+            self.connection.commit()
+            self.connection.close()
@@ -0,0 +1,161 @@
+"""
+archive_reader.py
+
+Read-only access to .zip and .tar archives as virtual directories. Member
+listings come from the zip central directory or a single streaming pass over
+the tar, and member contents are streamed from the archive, so nothing is
+ever extracted to disk.
+
+A member is addressed by a path below its archive, e.g.
+/shares/drop.zip/src/main.py. Opening such a path normally fails with
+NotADirectoryError (a path component is a regular file), which is where
+open_scanned_file switches to the archive.
+
+The most recently used archives are kept open so that reading many members
+reuses one member index; older handles are closed as others are opened, and
+close_archives releases the rest once the caller is done with the members.
+
+Author: Stewart Geisz
+GitHub: StewartGeisz
+"""
+
+import io
+import os
+import shutil
+import tarfile
+import threading
+import zipfile
+from collections import OrderedDict
+from typing import IO, Iterator, Optional, Tuple
+
+ZIP_SUFFIXES = ('.zip',)
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+# Archives kept open at once
+OPEN_ARCHIVES = 8
+
+
+def is_archive(name: str) -> bool:
+    """Whether a file name has an archive suffix this module can read"""
+    lower = name.lower()
+    return lower.endswith(ZIP_SUFFIXES) or lower.endswith(TAR_SUFFIXES)
+
+
+def list_archive(archive_path: str) -> Iterator[Tuple[str, int]]:
+    """Yield (member name, size) for the regular files in an archive.
+
+    Raises OSError, zipfile.BadZipFile or tarfile.TarError if the archive
+    cannot be read. Members with absolute paths or '..' components are skipped.
+    """
+    if archive_path.lower().endswith(ZIP_SUFFIXES):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and _is_safe_member(info.filename):
+                    yield info.filename, info.file_size
+    else:
+        # Stream mode reads the (possibly compressed) tar once, front to back
+        with tarfile.open(archive_path, 'r|*') as archive:
+            for member in archive:
+                if member.isfile() and _is_safe_member(member.name):
+                    yield member.name, member.size
+
+
+def _is_safe_member(name: str) -> bool:
+    parts = name.split('/')
+    return not name.startswith('/') and '..' not in parts and bool(parts[-1])
+
+
+def split_member_path(path: str) -> Optional[Tuple[str, str]]:
+    """Split a virtual member path into (archive path, member name), or None"""
+    parts = []
+    head = path
+    while True:
+        head, tail = os.path.split(head)
+        if not tail:
+            return None
+        candidate = os.path.join(head, tail)
+        if os.path.isfile(candidate):
+            if is_archive(tail) and parts:
+                return candidate, '/'.join(reversed(parts))
+            return None
+        parts.append(tail)
+
+
+# (archive path, mtime_ns) -> open ZipFile or TarFile, least recently used first
+_open_archives = OrderedDict()
+_open_archives_lock = threading.Lock()
+
+
+def _open_archive(archive_path: str, mtime_ns: int):
+    """Open archives stay cached, so materializing many members reuses one member index"""
+    key = (archive_path, mtime_ns)
+    with _open_archives_lock:
+        archive = _open_archives.get(key)
+        if archive is not None:
+            _open_archives.move_to_end(key)
+            return archive
+        if archive_path.lower().endswith(ZIP_SUFFIXES):
+            archive = zipfile.ZipFile(archive_path)
+        else:
+            archive = tarfile.open(archive_path, 'r:*')
+        _open_archives[key] = archive
+        while len(_open_archives) > OPEN_ARCHIVES:
+            _open_archives.popitem(last=False)[1].close()
+        return archive
+
+
+def close_archives():
+    """Close the archives kept open for open_member"""
+    with _open_archives_lock:
+        while _open_archives:
+            _open_archives.popitem()[1].close()
+
+
+def open_member(archive_path: str, member: str) -> IO[bytes]:
+    """Binary stream of one archive member"""
+    archive = _open_archive(archive_path, os.stat(archive_path).st_mtime_ns)
+    # Member names arrive normalized; archives created from "." store them as "./name"
+    if isinstance(archive, zipfile.ZipFile):
+        try:
+            return archive.open(member)
+        except KeyError:
+            return archive.open('./' + member)
+    try:
+        stream = archive.extractfile(member)
+    except KeyError:
+        stream = archive.extractfile('./' + member)
+    if stream is None:
+        raise IsADirectoryError(f"{member} is not a regular file in {archive_path}")
+    return stream
+
+
+def open_scanned_file(path: str, mode: str = 'r'):
+    """open() for scan records: real files as usual, archive members from their archive.
+
+    mode is 'r' (text, undecodable bytes ignored) or 'rb'.
+    """
+    try:
+        if mode == 'rb':
+            return open(path, 'rb')
+        return open(path, 'r', encoding='utf-8', errors='ignore')
+    except (NotADirectoryError, FileNotFoundError):
+        location = split_member_path(path)
+        if location is None:
+            raise
+    stream = open_member(*location)
+    if mode == 'rb':
+        return stream
+    return io.TextIOWrapper(stream, encoding='utf-8', errors='ignore')
+
+
+def copy_scanned_file(path: str, dst_path: str):
+    """shutil.copy2 for scan records; archive members are streamed straight to dst_path"""
+    try:
+        shutil.copy2(path, dst_path)
+        return
+    except (NotADirectoryError, FileNotFoundError):
+        location = split_member_path(path)
+        if location is None:
+            raise
+    with open_member(*location) as source, open(dst_path, 'wb') as destination:
+        shutil.copyfileobj(source, destination)
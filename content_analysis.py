@@ -0,0 +1,150 @@
+"""
+content_analysis.py
+
+Content analysis shared by the organizers' analyze_file_content: imports,
+function/class names and file references, extracted in one pass by the
+file's language analyzer (see language_analyzers).
+
+scan_file runs the analyzer's patterns as bytes directly over a
+memory-mapped file, so large files are never decoded into one str, and
+examines at most a configurable number of bytes, optionally through an
+AnalysisCache keyed by the digest of those bytes; without one, nothing is
+digested. Notebooks are read through notebook_stream, so only their code cells are analyzed and large
+outputs are never decoded. A file whose first bytes show it is binary
+despite its extension (see file_classifier) is not analyzed at all.
+
+Author: Stewart Geisz
+GitHub: StewartGeisz
+"""
+
+import io
+import mmap
+from typing import Dict, List, Optional, Tuple
+
+from analysis_cache import content_digest
+from archive_reader import open_scanned_file
+from file_classifier import BINARY, SNIFF_BYTES, sniff_prefix
+from language_analyzers import GENERIC, LanguageAnalyzer, analyzer_for
+
+# Bytes of a file examined by scan_file unless configured otherwise
+DEFAULT_MAX_ANALYSIS_BYTES = 16 * 1024 * 1024
+
+# Characters kept in a content summary
+SUMMARY_CHARS = 500
+
+# Layout of the results stored in an AnalysisCache; part of every cache key
+CACHE_FORMAT = 1
+
+
+def analysis_version(language: str, max_bytes: Optional[int]) -> str:
+    """Everything scan_file results depend on besides the file's bytes.
+
+    The result layout, which analyzer in which version, and how many bytes it
+    examines; stored analyses are only reused under the same string.
+    """
+    analyzer = analyzer_for(language)
+    name = language if analyzer is not GENERIC else 'generic'
+    return f"{CACHE_FORMAT}/{name}/{analyzer.version}/{max_bytes or 0}"
+
+
+def scan_content(content: str, language: str = 'Unknown') -> Dict[str, List[str]]:
+    """Extract imports, functions and references from text in one pass"""
+    return analyzer_for(language).scan_text(content)
+
+
+def scan_buffer(buffer, max_bytes: Optional[int] = None,
+                language: str = 'Unknown') -> Dict[str, List[str]]:
+    """scan_content for bytes-like buffers (bytes, mmap), looking at most at max_bytes"""
+    end = len(buffer) if not max_bytes else min(len(buffer), max_bytes)
+    return analyzer_for(language).scan(buffer, end)
+
+
+def scan_file(path: str, max_bytes: Optional[int] = DEFAULT_MAX_ANALYSIS_BYTES,
+              cache=None, language: str = 'Unknown') -> Tuple[Dict[str, List[str]], str]:
+    """Scan a file or archive member without reading it into memory as a str.
+
+    language is the file's detect_language name and selects its analyzer.
+    Regular files are memory-mapped; archive members are read up to
+    max_bytes. max_bytes of None or 0 examines the whole file. Analyzers
+    with a cell reader (notebooks) stream through the whole file instead and
+    stop after max_bytes of extracted code. Returns the scan_content matches
+    and a summary of the first SUMMARY_CHARS characters, or no matches and
+    an empty summary for a binary file. With an AnalysisCache, content that
+    was scanned before is not scanned again.
+    """
+    analyzer = analyzer_for(language)
+    with open_scanned_file(path, 'rb') as f:
+        if isinstance(getattr(f, 'raw', None), io.FileIO):
+            try:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                buffer = b''  # Empty files cannot be mapped
+        else:
+            buffer = f.read(max_bytes) if max_bytes else f.read()
+
+        try:
+            if analyzer.cell_reader is None and sniff_prefix(buffer[:SNIFF_BYTES])[0] == BINARY:
+                # Mislabeled binary: its bytes would only yield noise
+                return GENERIC.scan(b'', 0), ''
+            if cache is None:
+                return _analyze_buffer(buffer, max_bytes, analyzer), _summarize(buffer)
+            # Everything the results depend on: the examined bytes and the summary's,
+            # and the analysis_version that ran over them. A cell reader walks the
+            # whole file.
+            end = len(buffer) if not max_bytes else max(max_bytes, SUMMARY_CHARS * 4)
+            if analyzer.cell_reader is not None:
+                end = len(buffer)
+            digest = (f"{analysis_version(language, max_bytes)}:"
+                      f"{content_digest(buffer, min(end, len(buffer)))}")
+            cached = cache.get(digest)
+            if cached is not None:
+                return cached['matches'], cached['summary']
+            matches = _analyze_buffer(buffer, max_bytes, analyzer)
+            summary = _summarize(buffer)
+            cache.put(digest, {'matches': matches, 'summary': summary})
+            return matches, summary
+        finally:
+            if isinstance(buffer, mmap.mmap):
+                buffer.close()
+
+
+def _analyze_buffer(buffer, max_bytes: Optional[int],
+                    analyzer: LanguageAnalyzer) -> Dict[str, List[str]]:
+    if analyzer.cell_reader is not None:
+        cells = analyzer.cell_reader(buffer, max_bytes)
+        if cells is not None:
+            return _analyze_cells(cells, analyzer)
+
+    end = len(buffer) if not max_bytes else min(len(buffer), max_bytes)
+    matches = analyzer.scan(buffer, end)
+    if analyzer.import_parser is None or analyzer.cell_reader is not None:
+        return matches
+
+    # Decoded straight from the (mapped) buffer, without copying it to bytes first
+    with memoryview(buffer) as view, view[:end] as examined:
+        imports = analyzer.import_parser(str(examined, 'utf-8', 'ignore'))
+    if imports is not None:
+        matches['imports'] = imports
+    return matches
+
+
+def _analyze_cells(cells: List[str], analyzer: LanguageAnalyzer) -> Dict[str, List[str]]:
+    """Analysis of the code a cell_reader extracted, in place of the raw buffer"""
+    text = '\n'.join(cells)
+    matches = analyzer.scan_text(text)
+    if analyzer.import_parser is None:
+        return matches
+
+    imports = analyzer.import_parser(cells)
+    if imports is not None:
+        matches['imports'] = imports
+    return matches
+
+
+def _summarize(buffer) -> str:
+    """The first SUMMARY_CHARS characters, with '...' if there is more"""
+    head = bytes(buffer[:SUMMARY_CHARS * 4])
+    text = head.decode('utf-8', 'ignore').replace('\r\n', '\n')
+    if len(text) > SUMMARY_CHARS or len(buffer) > len(head):
+        return text[:SUMMARY_CHARS] + '...'
+    return text
@@ -13,14 +13,32 @@ import os
 import sys
 import subprocess
 import argparse
+import time
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import re
 
+from file_scanner import DirectoryWalker, ScanTree
+from ignore_rules import IgnoreMatcher
+from scan_index import ScanIndex
+
 
 class ExistingProjectsManager:
-    def __init__(self, github_username: str = "StewartGeisz"):
+    def __init__(self, github_username: str = "StewartGeisz", workers: int = 1,
+                 index_path: Optional[str] = None, exclude: Optional[List[str]] = None,
+                 use_gitignore: bool = True, probe_max_entries: int = 10000,
+                 probe_max_seconds: float = 5.0):
         self.github_username = github_username
+        self.workers = workers  # Threads used for directory traversal
+        self.index = ScanIndex(index_path) if index_path else None  # Persistent scan index
+        self.ignore = IgnoreMatcher.from_excludes(exclude)  # Extra globs to skip while scanning
+        self.use_gitignore = use_gitignore
+        self.scan_tree = None  # Shared ScanTree of the current run
+        # Budget for deciding whether one directory is a project
+        self.probe_max_entries = probe_max_entries
+        self.probe_max_seconds = probe_max_seconds
+        self.probe_reports = {}  # directory path -> (entries examined, seconds, budget exhausted)
         self.supported_code_extensions = {
             '.py', '.js', '.ts', '.java', '.cpp', '.c', '.cs', '.php', '.rb', '.go',
             '.rs', '.swift', '.kt', '.scala', '.r', '.m', '.pl', '.sh', '.sql', 
@@ -46,6 +64,23 @@ class ExistingProjectsManager:
             
         return git_available, gh_available
 
+    def create_walker(self) -> DirectoryWalker:
+        """Directory walker configured with this manager's scan options"""
+        return DirectoryWalker(self.supported_code_extensions, set(),
+                               skip_dirs={'.git', '__pycache__', 'node_modules', '.venv',
+                                          'venv', 'env', '.pytest_cache', 'dist', 'build'},
+                               index=self.index, ignore=self.ignore,
+                               use_gitignore=self.use_gitignore)
+
+    def get_scan_tree(self, directory_path: str) -> Tuple[ScanTree, str]:
+        """Return the run's shared scan tree and the relative path of directory_path in it"""
+        if self.scan_tree is not None:
+            relative_dir = self.scan_tree.relative(directory_path)
+            if relative_dir is not None:
+                return self.scan_tree, relative_dir
+        # Outside the current run (e.g. called directly): use a throwaway tree
+        return ScanTree(self.create_walker(), directory_path), ''
+
     def detect_projects_in_directory(self, directory_path: str) -> List[Dict[str, str]]:
         """Detect project folders in the given directory"""
         if not os.path.exists(directory_path):
@@ -55,6 +90,11 @@ class ExistingProjectsManager:
         projects = []
         print(f"🔍 Scanning for projects in: {directory_path}")
         
+        # One shared tree per run: every directory is listed once and reused by
+        # the project probes, descriptions, .gitignore and README generation
+        self.scan_tree = ScanTree(self.create_walker(), directory_path)
+        self.probe_reports = {}
+        
         # Check if the directory itself is a project
         if self.is_project_directory(directory_path):
             project_name = os.path.basename(directory_path)
@@ -65,18 +105,24 @@ class ExistingProjectsManager:
             })
         
         # Check subdirectories
-        try:
-            for item in os.listdir(directory_path):
-                item_path = os.path.join(directory_path, item)
-                if os.path.isdir(item_path) and not item.startswith('.'):
-                    if self.is_project_directory(item_path):
-                        projects.append({
-                            'name': item,
-                            'path': item_path,
-                            'description': self.get_project_description(item_path, item)
-                        })
-        except PermissionError:
-            print(f"⚠️ Permission denied accessing: {directory_path}")
+        candidates = [os.path.basename(subdir) for subdir in self.scan_tree.subdirectories('')
+                      if not os.path.basename(subdir).startswith('.')]
+            
+        candidate_paths = [os.path.join(directory_path, item) for item in candidates]
+        if self.workers > 1:
+            # Probe candidates concurrently; map keeps results in listing order
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                verdicts = list(executor.map(self.is_project_directory, candidate_paths))
+        else:
+            verdicts = [self.is_project_directory(path) for path in candidate_paths]
+            
+        for item, item_path, is_project in zip(candidates, candidate_paths, verdicts):
+            if is_project:
+                projects.append({
+                    'name': item,
+                    'path': item_path,
+                    'description': self.get_project_description(item_path, item)
+                })
             
         return projects
 
@@ -92,39 +138,57 @@ class ExistingProjectsManager:
                        '.idea', '.vscode', 'bin', 'obj'}:
             return False
             
-        # Count code files
+        # Count code files breadth-first, stopping as soon as the criteria are met
         code_files = 0
         total_files = 0
-        
-        try:
-            for root, dirs, files in os.walk(directory_path):
-                # Skip nested package directories
-                dirs[:] = [d for d in dirs if d not in {'.git', '__pycache__', 'node_modules', 
-                          '.venv', 'venv', 'env', '.pytest_cache', 'dist', 'build'}]
-                
-                for file in files:
-                    if not file.startswith('.'):
+        entries = 0
+        started = time.monotonic()
+        exhausted = False
+        
+        tree, relative_dir = self.get_scan_tree(directory_path)
+        level = [relative_dir]
+        for depth in range(5):  # Don't go too deep for performance
+            next_level = []
+            for current in level:
+                files = tree.files(current)
+                entries += len(files) + 1
+                for file_info in files:
+                    if not file_info['name'].startswith('.'):
                         total_files += 1
-                        file_ext = os.path.splitext(file)[1].lower()
-                        if file_ext in self.supported_code_extensions:
+                        if file_info['is_code']:
                             code_files += 1
-                            
-                # Don't go too deep for performance
-                if len(root.split(os.sep)) - len(directory_path.split(os.sep)) > 3:
-                    dirs.clear()
-                    
-        except (PermissionError, OSError):
-            return False
-            
-        # Project criteria: at least 1 code file or 3+ files total
-        return code_files >= 1 or total_files >= 3
+                
+                # Project criteria: at least 1 code file or 3+ files total
+                if code_files >= 1 or total_files >= 3:
+                    self.probe_reports[directory_path] = (entries, time.monotonic() - started, False)
+                    return True
+                
+                if (entries >= self.probe_max_entries
+                        or time.monotonic() - started >= self.probe_max_seconds):
+                    exhausted = True
+                    break
+                next_level.extend(tree.subdirectories(current))
+            if exhausted or not next_level:
+                break
+            level = next_level
+        
+        elapsed = time.monotonic() - started
+        self.probe_reports[directory_path] = (entries, elapsed, exhausted)
+        if exhausted:
+            print(f"⏱️ Probe budget exhausted for {directory_path} after {entries} entries "
+                  f"({elapsed:.1f}s); treating it as not a project")
+        return False
 
     def get_project_description(self, project_path: str, project_name: str) -> str:
         """Generate a description for the project"""
+        tree, relative_dir = self.get_scan_tree(project_path)
+        top_level_files = tree.files(relative_dir)
+        top_level_names = {file_info['name'] for file_info in top_level_files}
+        
         # Check for existing README
         for readme_name in ['README.md', 'README.txt', 'readme.md', 'README']:
             readme_path = os.path.join(project_path, readme_name)
-            if os.path.exists(readme_path):
+            if readme_name in top_level_names:
                 try:
                     with open(readme_path, 'r', encoding='utf-8', errors='ignore') as f:
                         content = f.read()[:500]
@@ -141,28 +205,24 @@ class ExistingProjectsManager:
         languages = set()
         special_files = set()
         
-        try:
-            for file in os.listdir(project_path):
-                if os.path.isfile(os.path.join(project_path, file)):
-                    file_lower = file.lower()
-                    file_ext = os.path.splitext(file)[1].lower()
-                    
-                    # Detect languages
-                    lang_map = {
-                        '.py': 'Python', '.js': 'JavaScript', '.ts': 'TypeScript',
-                        '.java': 'Java', '.cpp': 'C++', '.c': 'C', '.cs': 'C#',
-                        '.ipynb': 'Jupyter Notebook', '.r': 'R', '.sql': 'SQL',
-                        '.html': 'Web', '.css': 'Web', '.php': 'PHP'
-                    }
-                    if file_ext in lang_map:
-                        languages.add(lang_map[file_ext])
-                    
-                    # Detect special project types
-                    if file_lower in {'package.json', 'requirements.txt', 'pom.xml', 
-                                    'cargo.toml', 'makefile', 'dockerfile'}:
-                        special_files.add(file_lower)
-        except Exception:
-            pass
+        for file_info in top_level_files:
+            file_lower = file_info['name'].lower()
+            file_ext = file_info['extension']
+            
+            # Detect languages
+            lang_map = {
+                '.py': 'Python', '.js': 'JavaScript', '.ts': 'TypeScript',
+                '.java': 'Java', '.cpp': 'C++', '.c': 'C', '.cs': 'C#',
+                '.ipynb': 'Jupyter Notebook', '.r': 'R', '.sql': 'SQL',
+                '.html': 'Web', '.css': 'Web', '.php': 'PHP'
+            }
+            if file_ext in lang_map:
+                languages.add(lang_map[file_ext])
+            
+            # Detect special project types
+            if file_lower in {'package.json', 'requirements.txt', 'pom.xml', 
+                            'cargo.toml', 'makefile', 'dockerfile'}:
+                special_files.add(file_lower)
         
         # Generate description based on analysis
         if languages:
@@ -194,21 +254,19 @@ class ExistingProjectsManager:
         has_java = False
         has_web = False
         
-        try:
-            for root, dirs, files in os.walk(project_path):
-                for file in files:
-                    ext = os.path.splitext(file)[1].lower()
-                    if ext in ['.py', '.ipynb']:
-                        has_python = True
-                    elif ext in ['.js', '.ts', '.json'] or file == 'package.json':
-                        has_js = True
-                    elif ext == '.java' or file == 'pom.xml':
-                        has_java = True
-                    elif ext in ['.html', '.css']:
-                        has_web = True
-                break  # Only check top level for performance
-        except Exception:
-            pass
+        # Only check top level for performance
+        tree, relative_dir = self.get_scan_tree(project_path)
+        for file_info in tree.files(relative_dir):
+            file = file_info['name']
+            ext = file_info['extension']
+            if ext in ['.py', '.ipynb']:
+                has_python = True
+            elif ext in ['.js', '.ts', '.json'] or file == 'package.json':
+                has_js = True
+            elif ext == '.java' or file == 'pom.xml':
+                has_java = True
+            elif ext in ['.html', '.css']:
+                has_web = True
         
         # Base gitignore
         gitignore = """# OS generated files
@@ -307,17 +365,15 @@ build/
         files_info = []
         main_files = []
         
-        try:
-            for file in sorted(os.listdir(project_path)):
-                if os.path.isfile(os.path.join(project_path, file)) and not file.startswith('.'):
-                    files_info.append(file)
-                    # Identify likely main files
-                    file_lower = file.lower()
-                    if file_lower in ['main.py', 'index.js', 'app.py', 'server.js', 
-                                    'main.java', 'index.html', 'run.py']:
-                        main_files.append(file)
-        except Exception:
-            pass
+        tree, relative_dir = self.get_scan_tree(project_path)
+        for file in sorted(file_info['name'] for file_info in tree.files(relative_dir)):
+            if not file.startswith('.'):
+                files_info.append(file)
+                # Identify likely main files
+                file_lower = file.lower()
+                if file_lower in ['main.py', 'index.js', 'app.py', 'server.js', 
+                                'main.java', 'index.html', 'run.py']:
+                    main_files.append(file)
         
         readme = f"""# {project_name.replace('_', ' ').replace('-', ' ').title()}
 
@@ -505,6 +561,8 @@ build/
         
         # Detect projects
         projects = self.detect_projects_in_directory(directory_path)
+        if self.index:
+            self.index.commit()  # Persist listings for the next run
         
         if not projects:
             print("❌ No projects found in directory")
@@ -512,7 +570,14 @@ build/
         
         print(f"✅ Found {len(projects)} projects:")
         for project in projects:
-            print(f"  - {project['name']}: {project['description']}")
+            entries, elapsed, _ = self.probe_reports[project['path']]
+            print(f"  - {project['name']}: {project['description']} "
+                  f"(probed {entries} entries in {elapsed:.2f}s)")
+        exhausted = sum(1 for _, _, budget_hit in self.probe_reports.values() if budget_hit)
+        print(f"⏱️ Probed {len(self.probe_reports)} directories: "
+              f"{sum(report[0] for report in self.probe_reports.values())} entries in "
+              f"{sum(report[1] for report in self.probe_reports.values()):.2f}s, "
+              f"{exhausted} over budget")
         
         print()
         
@@ -541,6 +606,18 @@ def main():
     parser.add_argument("directory", type=str, help="Directory containing existing projects")
     parser.add_argument("--github-user", type=str, default="StewartGeisz", help="GitHub username")
     parser.add_argument("--no-github", action="store_true", help="Skip GitHub repository creation")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of threads used to traverse directories (default: 1)")
+    parser.add_argument("--index", type=str, default=None,
+                        help="SQLite scan index reused across runs for incremental rescans")
+    parser.add_argument("--exclude", type=str, action="append", default=[],
+                        help="Gitignore-style glob to skip while scanning (repeatable)")
+    parser.add_argument("--no-gitignore", action="store_true",
+                        help="Do not honor .gitignore files found in the scanned tree")
+    parser.add_argument("--probe-max-entries", type=int, default=10000,
+                        help="Entries examined per directory when deciding if it is a project (default: 10000)")
+    parser.add_argument("--probe-max-seconds", type=float, default=5.0,
+                        help="Seconds spent per directory when deciding if it is a project (default: 5)")
     
     args = parser.parse_args()
     
@@ -548,7 +625,11 @@ def main():
         print(f"❌ Directory not found: {args.directory}")
         sys.exit(1)
     
-    manager = ExistingProjectsManager(github_username=args.github_user)
+    manager = ExistingProjectsManager(github_username=args.github_user, workers=args.workers,
+                                      index_path=args.index, exclude=args.exclude,
+                                      use_gitignore=not args.no_gitignore,
+                                      probe_max_entries=args.probe_max_entries,
+                                      probe_max_seconds=args.probe_max_seconds)
     
     try:
         successful_projects = manager.process_existing_projects(
@@ -0,0 +1,105 @@
+"""
+file_classifier.py
+
+Content-sniffing file type classifier. Reads a small fixed prefix of a file
+and decides from magic bytes, the share of null/control bytes and a possible
+shebang line whether it is text, an interpreted script or binary. The walker
+sniffs extensionless files and executables with an extension it does not
+know, so scripts are recognised as code; content_analysis checks code files
+as it analyzes them, so mislabeled binaries stay out of the text analysis.
+
+Author: Stewart Geisz
+GitHub: StewartGeisz
+"""
+
+import os
+from typing import Optional, Tuple
+
+SNIFF_BYTES = 4096
+
+# Verdicts stored in FileRecord.content_type
+TEXT = 'text'
+SCRIPT = 'script'
+BINARY = 'binary'
+
+MAGIC_NUMBERS = (
+    b'\x89PNG', b'\xff\xd8\xff', b'GIF87a', b'GIF89a', b'%PDF', b'PK\x03\x04', b'PK\x05\x06',
+    b'\x1f\x8b', b'\xfd7zXZ\x00', b'7z\xbc\xaf', b'Rar!', b'\x7fELF',
+    b'\xca\xfe\xba\xbe', b'\xcf\xfa\xed\xfe', b'\xce\xfa\xed\xfe', b'SQLite format 3\x00',
+    b'\x00asm', b'OggS', b'ID3\x02', b'ID3\x03', b'ID3\x04', b'fLaC', b'RIFF', b'\x00\x00\x01\x00',
+    # bzip2 is 'BZh' and a block size digit, which text can start with too, then the block magic
+    *(b'BZh%d1AY&SY' % level for level in range(1, 10)),
+)
+
+TEXT_BOMS = (b'\xef\xbb\xbf', b'\xff\xfe', b'\xfe\xff')
+
+# Interpreter named on a shebang line -> extension used for language detection
+SHEBANG_EXTENSIONS = {
+    'python': '.py', 'python2': '.py', 'python3': '.py',
+    'sh': '.sh', 'bash': '.sh', 'zsh': '.sh', 'ksh': '.sh', 'dash': '.sh',
+    'node': '.js', 'nodejs': '.js', 'deno': '.ts',
+    'perl': '.pl', 'ruby': '.rb', 'php': '.php', 'Rscript': '.r',
+}
+
+# env options followed by a separate argument (`env -u NAME python`)
+ENV_OPTIONS_WITH_ARGUMENT = {'-u', '--unset', '-C', '--chdir', '-P'}
+
+# Bytes that never appear in text files (everything below 0x20 except \t \n \f \r and ESC)
+CONTROL_BYTES = bytes(b for b in range(32) if b not in (9, 10, 12, 13, 27))
+
+
+def sniff_prefix(prefix: bytes) -> Tuple[str, Optional[str]]:
+    """Classify a file from its first bytes, returning (verdict, extension hint)"""
+    if not prefix:
+        return TEXT, None
+
+    if prefix.startswith(b'#!'):
+        line = prefix[2:].split(b'\n', 1)[0].decode('utf-8', 'ignore').split()
+        if line:
+            interpreter = os.path.basename(line[0])
+            if interpreter == 'env':
+                interpreter = _env_command(line[1:]) or interpreter
+            # python3.11 -> python
+            interpreter = interpreter.rstrip('0123456789.') or interpreter
+            return SCRIPT, SHEBANG_EXTENSIONS.get(interpreter)
+        return SCRIPT, None
+
+    if prefix.startswith(TEXT_BOMS):
+        return TEXT, None
+    if prefix.startswith(MAGIC_NUMBERS) or _is_pe_executable(prefix):
+        return BINARY, None
+
+    if b'\x00' in prefix:
+        return BINARY, None
+    control = len(prefix) - len(prefix.translate(None, CONTROL_BYTES))
+    if control / len(prefix) > 0.1:
+        return BINARY, None
+    return TEXT, None
+
+
+def _env_command(arguments) -> Optional[str]:
+    """The command `env arguments...` runs: the first word that is not an option or NAME=VALUE"""
+    arguments = iter(arguments)
+    for argument in arguments:
+        if argument in ENV_OPTIONS_WITH_ARGUMENT:
+            next(arguments, None)
+        elif not argument.startswith('-') and '=' not in argument:
+            return os.path.basename(argument)
+    return None
+
+
+def _is_pe_executable(prefix: bytes) -> bool:
+    """'MZ' alone starts plenty of text; a Windows executable's DOS header also points at 'PE\\0\\0'"""
+    if not prefix.startswith(b'MZ') or len(prefix) < 0x40:
+        return False
+    header = int.from_bytes(prefix[0x3c:0x40], 'little')
+    return prefix[header:header + 4] == b'PE\x00\x00'
+
+
+def classify_file(file_path: str) -> Tuple[str, Optional[str]]:
+    """Read the fixed-size prefix of a file and classify it"""
+    try:
+        with open(file_path, 'rb') as f:
+            return sniff_prefix(f.read(SNIFF_BYTES))
+    except OSError:
+        return TEXT, None
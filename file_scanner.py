@@ -0,0 +1,834 @@
+"""
+file_scanner.py
+
+Directory traversal shared by the project organizers. Walks a tree with
+os.scandir so the d_type and stat data of each DirEntry are reused instead of
+being re-queried with os.path.exists / os.path.getsize, and derives relative
+paths by slicing off the root prefix rather than calling os.path.relpath.
+
+With more than one worker, directory listings are fetched by a bounded pool of
+threads sharing a work-stealing queue of directories, which keeps many
+listings in flight on high-latency storage such as NFS. The threads read at
+most a fixed number of listings ahead of the walk, so a slow consumer does
+not make them buffer the whole tree. Records are still yielded in os.walk
+order, so the output matches the serial walk exactly.
+
+Subtrees excluded by the tree's own (nested) .gitignore files or by user
+--exclude globs are pruned before they are entered.
+
+Hardlinked and symlinked files and all directories are identified by
+(st_dev, st_ino): a hardlink of a file seen earlier in the walk, a symlink to
+a file in the tree, and every file of a bind-mounted copy of a directory seen
+earlier are recorded as aliases of the first record (of the target, for
+symlinks), and a directory that is one of its own ancestors (a bind-mount
+loop) is not entered. Other files cannot repeat outside a repeated
+directory, so their ids are never kept.
+
+With scan_archives, .zip and .tar files are opened as virtual directories:
+their members are yielded as groups below the archive's path and are read
+and copied through archive_reader, without extracting anything to disk.
+
+A walk can be bounded by a number of directory entries and a wall-clock
+deadline. The budget is checked between directories: when either runs out
+the walk stops after the directory in hand, which it never cuts short, sets
+truncated and lists the subtrees it did not start in skipped_subtrees. Every
+directory is either fully reported or named there, and a resumed walk always
+gets past the first directory of its frontier, however large.
+
+With a checkpoint directory, finished groups and the pending frontier are
+written to a ScanCheckpoint as the walk goes, and resume=True replays a saved
+checkpoint and continues from its frontier instead of starting over.
+
+Author: Stewart Geisz
+GitHub: StewartGeisz
+"""
+
+import os
+import stat
+import sys
+import threading
+import time
+from collections import deque
+from typing import List, Dict, Any, Optional, Set, Tuple, Iterator
+
+from archive_reader import copy_scanned_file, is_archive, list_archive
+from file_classifier import SCRIPT, classify_file
+from ignore_rules import IgnoreMatcher
+from scan_checkpoint import ScanCheckpoint
+from scan_index import ScanIndex
+
+# How a listed file can be reached under another path
+UNLINKED, HARDLINKED, SYMLINKED = 0, 1, 2
+
+# Directories that never contain project sources
+SKIP_DIRECTORIES = {
+    '.git', '__pycache__', 'node_modules', '.venv', 'venv', 'env',
+    '.pytest_cache', 'dist', 'build', 'target', '.idea', '.vscode'
+}
+
+
+class FileRecord:
+    """Compact file information record.
+
+    Behaves like the dicts the organizers used to build (record['name'],
+    record.get('size'), dict(record)) but stores its fields in slots, interns
+    the directory and extension strings shared by many files, and derives
+    relative_path and name from offsets into path instead of storing copies.
+    """
+
+    FIELDS = ('path', 'relative_path', 'name', 'extension', 'size', 'is_code', 'is_data', 'directory',
+              'content_type', 'alias_of')
+
+    __slots__ = ('path', 'extension', 'size', 'is_code', 'is_data', 'directory', 'content_type',
+                 'alias_of', '_relative_start', '_name_start')
+
+    def __init__(self, path: str, relative_start: int, name: str, extension: str, size: int,
+                 is_code: bool, is_data: bool, directory: str, content_type: Optional[str] = None,
+                 alias_of: Optional[str] = None):
+        self.path = path
+        self._relative_start = relative_start
+        self._name_start = len(path) - len(name)
+        self.extension = sys.intern(extension)
+        self.size = size
+        self.is_code = is_code
+        self.is_data = is_data
+        self.directory = sys.intern(directory)
+        self.content_type = content_type  # Sniffed verdict from file_classifier, if any
+        self.alias_of = alias_of  # Path of the first record with the same inode, if any
+
+    @property
+    def relative_path(self) -> str:
+        return self.path[self._relative_start:]
+
+    @property
+    def name(self) -> str:
+        return self.path[self._name_start:]
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in self.FIELDS or key in ('relative_path', 'name'):
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.FIELDS
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self) -> int:
+        return len(self.FIELDS)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in self.FIELDS else default
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.FIELDS
+
+    def values(self) -> List[Any]:
+        return [getattr(self, key) for key in self.FIELDS]
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(key, getattr(self, key)) for key in self.FIELDS]
+
+    def to_row(self) -> List[Any]:
+        """Compact list form used in scan checkpoints"""
+        return [self.name, self.extension, self.size, self.is_code, self.is_data,
+                self.content_type, self.alias_of]
+
+    @classmethod
+    def from_row(cls, row: List[Any], directory_path: str, relative_dir: str) -> 'FileRecord':
+        """Rebuild a record written by to_row for a walk of directory_path"""
+        name, extension, size, is_code, is_data, content_type, alias_of = row
+        prefix = directory_path if directory_path.endswith(os.sep) else directory_path + os.sep
+        return cls(os.path.join(prefix + relative_dir, name), len(prefix), name, extension, size,
+                   is_code, is_data, relative_dir, content_type, alias_of)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, FileRecord):
+            return all(getattr(self, key) == getattr(other, key) for key in self.FIELDS)
+        if isinstance(other, dict):
+            return dict(self.items()) == other  # Key order does not matter, as between dicts
+        return NotImplemented
+
+    __hash__ = None  # Mutable and compared by value, like the dicts it replaces
+
+    def __reduce__(self):
+        return (FileRecord, (self.path, self._relative_start, self.name, self.extension,
+                             self.size, self.is_code, self.is_data, self.directory,
+                             self.content_type, self.alias_of))
+
+    def __repr__(self) -> str:
+        return f"FileRecord({dict(self.items())!r})"
+
+
+def copy_file_record(file_info: Dict[str, Any], dst_path: str, copied: Dict[str, str]) -> bool:
+    """Copy a scanned file into an output folder, hardlinking repeated copies of one inode.
+
+    copied maps a source path to the first destination written for it and is
+    shared across the projects of one run. Returns True if dst_path was linked.
+    """
+    source = file_info.get('alias_of') or file_info['path']
+    first_copy = copied.get(source)
+    if first_copy is not None and first_copy != dst_path:
+        try:
+            if os.path.lexists(dst_path):
+                os.remove(dst_path)
+            os.link(first_copy, dst_path)
+            return True
+        except OSError:
+            pass  # Different filesystem or no hardlink support: copy instead
+
+    # Never write through a link left by an earlier run into another project's file
+    if os.path.isfile(dst_path) and os.stat(dst_path).st_nlink > 1:
+        os.remove(dst_path)
+    copy_scanned_file(file_info['path'], dst_path)
+    copied.setdefault(source, dst_path)
+    return False
+
+
+class DirectoryWalker:
+    def __init__(self, code_extensions: Set[str], data_extensions: Set[str],
+                 skip_dirs: Optional[Set[str]] = None, workers: int = 1,
+                 max_depth: Optional[int] = None, index: Optional[ScanIndex] = None,
+                 ignore: Optional[IgnoreMatcher] = None, use_gitignore: bool = True,
+                 sniff_content: bool = False, scan_archives: bool = False,
+                 max_entries: Optional[int] = None, deadline: Optional[float] = None,
+                 checkpoint_dir: Optional[str] = None, resume: bool = False):
+        self.code_extensions = code_extensions
+        self.data_extensions = data_extensions
+        self.skip_dirs = SKIP_DIRECTORIES if skip_dirs is None else skip_dirs
+        self.workers = max(1, workers)
+        self.max_depth = max_depth  # None walks the whole tree; 0 lists only the root
+        self.index = index  # Optional ScanIndex reused across runs
+        self.ignore = ignore or IgnoreMatcher()  # User --exclude globs
+        self.use_gitignore = use_gitignore  # Honor .gitignore files found in the tree
+        self.sniff_content = sniff_content  # Classify unknown and extensionless files by their first bytes
+        self.scan_archives = scan_archives  # Treat .zip/.tar files as virtual directories
+        self.max_entries = max_entries  # Directory entries one walk may list
+        self.deadline = deadline  # time.time() after which a walk stops
+        self.checkpoint_dir = checkpoint_dir  # Where walks save their progress
+        self.resume = resume  # Continue from a saved checkpoint if there is one
+
+        # Outcome of the last walk_groups run
+        self.truncated = False
+        self.skipped_subtrees = []  # Relative directories left unscanned, in walk order
+        self._entries = 0  # Directory entries the current walk has gone through
+
+    def walk(self, directory_path: str) -> Iterator[FileRecord]:
+        """Yield file information records in the same order as os.walk"""
+        for _, files in self.walk_groups(directory_path):
+            yield from files
+
+    def walk_groups(self, directory_path: str, start: str = '', recursive: bool = True
+                    ) -> Iterator[Tuple[str, List[FileRecord]]]:
+        """Yield (relative directory, file records) as each directory is finished.
+
+        Only the current directory's records are held, so consumers that process
+        one group at a time use memory proportional to the largest directory.
+        Directories without files are not yielded.
+
+        start walks only the subtree at that relative directory (with relative
+        paths still measured from directory_path); recursive=False lists just
+        that one directory, including the members of its archives.
+        """
+        prefix = directory_path if directory_path.endswith(os.sep) else directory_path + os.sep
+        matcher = self._matcher_for(directory_path, start)
+        if matcher is None:
+            return
+        start_path = os.path.join(directory_path, start) if start else directory_path
+        root = (start_path, start, start.count(os.sep) + 1 if start else 0, matcher, frozenset())
+        seen_files = {}  # (st_dev, st_ino) of a linked file -> path of its first record
+        seen_dirs = {}  # (st_dev, st_ino) of a directory with files -> its first path
+        self.truncated = False
+        self.skipped_subtrees = []
+        self._entries = 0
+
+        # Depth-first stack of (absolute path, relative directory, depth, ignore matcher,
+        # ancestor directory ids)
+        stack = [root]
+        checkpoint = None
+        if self.checkpoint_dir:
+            checkpoint = ScanCheckpoint(self.checkpoint_dir, directory_path, start, recursive)
+            state = checkpoint.load() if self.resume else None
+            if state is not None:
+                for relative_dir, rows, file_ids, dir_id in state['groups']:
+                    files = [FileRecord.from_row(row, directory_path, relative_dir) for row in rows]
+                    if dir_id is not None:
+                        seen_dirs.setdefault(tuple(dir_id), prefix + relative_dir)
+                    for record, file_id in zip(files, file_ids):
+                        if file_id is not None:
+                            seen_files.setdefault(tuple(file_id), record.alias_of or record.path)
+                    yield relative_dir, files
+                if state['complete']:
+                    return
+                stack = [node for node in (self._resume_node(directory_path, relative_dir)
+                                           for relative_dir in reversed(state['frontier']))
+                         if node is not None]
+            checkpoint.open(state)
+
+        scanner = None
+        if self.workers > 1 and recursive and stack:
+            scanner = _WorkStealingScanner(self, prefix, self.workers)
+            scanner.start(stack)
+
+        try:
+            while stack:
+                node = stack.pop()
+                if scanner:
+                    outcome = scanner.result(node[0])
+                else:
+                    outcome = self._scan_directory(node, prefix)
+                files, subdirs, matcher, file_ids, ancestors, dir_id, entries = outcome
+                # Charged as the walk takes each directory, so listings read ahead by
+                # the workers do not count and every worker count truncates alike
+                self._entries += entries
+                # Aliases are assigned here, in walk order, so the result does not depend on
+                # which worker listed a directory first
+                first_dir = prefix + node[1]
+                if files and dir_id is not None:
+                    first_dir = seen_dirs.setdefault(dir_id, first_dir)
+                for record, file_id in zip(files, file_ids):
+                    if file_id is not None:
+                        # A symlink arrives as an alias of its target, which comes first
+                        canonical = seen_files.setdefault(file_id, record.alias_of or record.path)
+                        record.alias_of = canonical if canonical != record.path else None
+                    elif first_dir != prefix + node[1]:
+                        # Bind-mounted copy of a directory seen before: every file repeats
+                        record.alias_of = os.path.join(first_dir, record.name)
+                archive_groups = []
+                if self.scan_archives:
+                    # Expansion drops archive records, so remember which id belongs to which path
+                    ids_by_path = dict(zip((record.path for record in files), file_ids))
+                    files, archive_groups = self.expand_archives(files, matcher, prefix)
+                    file_ids = [ids_by_path[record.path] for record in files]
+                if checkpoint:
+                    if files:
+                        checkpoint.add_group(node[1], [record.to_row() for record in files],
+                                             file_ids, dir_id)
+                    for relative_dir, group in archive_groups:
+                        checkpoint.add_group(relative_dir, [record.to_row() for record in group],
+                                             [None] * len(group), None)
+                if files:
+                    yield node[1], files
+                yield from archive_groups
+                # Push in reverse so subdirectories are visited in listing order
+                if recursive:
+                    stack.extend(reversed(self._child_nodes(node, subdirs, matcher, ancestors)))
+                if stack and self._budget_exhausted():
+                    # Checked between directories, so every walk (and every resumed walk)
+                    # finishes at least the directory it started with
+                    self.truncated = True
+                    self.skipped_subtrees = [pending[1] for pending in reversed(stack)]
+                    if checkpoint:
+                        checkpoint.save_frontier(self.skipped_subtrees)
+                    return
+                if checkpoint:
+                    checkpoint.maybe_save_frontier([pending[1] for pending in reversed(stack)])
+            if checkpoint:
+                checkpoint.mark_complete()
+        finally:
+            if scanner:
+                scanner.stop()
+            if checkpoint:
+                checkpoint.close()
+
+    def scan_group(self, directory_path: str, relative_dir: str) -> List[FileRecord]:
+        """Return the file records of a single directory below directory_path (non-recursive)"""
+        prefix = directory_path if directory_path.endswith(os.sep) else directory_path + os.sep
+        dir_path = os.path.join(directory_path, relative_dir) if relative_dir else directory_path
+        matcher = self._matcher_for(directory_path, relative_dir)
+        if matcher is None:
+            return []
+
+        files = self._scan_directory((dir_path, relative_dir, 0, matcher, frozenset()), prefix)[0]
+        return files
+
+    def _resume_node(self, directory_path: str, relative_dir: str) -> Optional[Tuple]:
+        """Stack node for a checkpoint frontier directory, or None if it is now ignored"""
+        matcher = self._matcher_for(directory_path, relative_dir)
+        if matcher is None:
+            return None
+        path = os.path.join(directory_path, relative_dir) if relative_dir else directory_path
+        depth = relative_dir.count(os.sep) + 1 if relative_dir else 0
+        return (path, relative_dir, depth, matcher, frozenset())
+
+    def _matcher_for(self, directory_path: str, relative_dir: str) -> Optional[IgnoreMatcher]:
+        """Rebuild the ignore rules that apply in a directory from the root down.
+
+        Returns None if the directory itself is skipped or ignored.
+        """
+        matcher = self.ignore
+        ancestor_path, ancestor_dir = directory_path, ''
+        for part in (relative_dir.split(os.sep) if relative_dir else []):
+            if self.use_gitignore and os.path.isfile(os.path.join(ancestor_path, '.gitignore')):
+                matcher = matcher.extend(ancestor_dir, os.path.join(ancestor_path, '.gitignore'))
+            ancestor_path = os.path.join(ancestor_path, part)
+            ancestor_dir = os.path.join(ancestor_dir, part) if ancestor_dir else part
+            if part in self.skip_dirs or matcher.is_ignored(ancestor_dir, True):
+                return None
+        return matcher
+
+    def expand_archives(self, files: List[FileRecord], matcher: IgnoreMatcher, prefix: str
+                        ) -> Tuple[List[FileRecord], List[Tuple[str, List[FileRecord]]]]:
+        """Replace readable archives among a directory's records by groups of their members.
+
+        Returns the remaining records and (virtual directory, member records)
+        groups, one per directory inside each archive in member order.
+        Unreadable archives stay ordinary data files.
+        """
+        remaining = []
+        groups = []
+        for record in files:
+            if not is_archive(record.name):
+                remaining.append(record)
+                continue
+            try:
+                members = self._archive_groups(record, matcher, prefix)
+            except Exception:
+                # Corrupt, encrypted or not really an archive: keep it as an opaque file
+                remaining.append(record)
+                continue
+            groups.extend(members)
+        return remaining, groups
+
+    def _archive_groups(self, archive: FileRecord, matcher: IgnoreMatcher, prefix: str
+                        ) -> List[Tuple[str, List[FileRecord]]]:
+        groups = {}  # Virtual directory -> member records, in first-seen order
+        for member_name, size in list_archive(archive.path):
+            parts = [part for part in member_name.split('/') if part not in ('', '.')]
+            if any(part in self.skip_dirs for part in parts[:-1]):
+                continue
+            member_path = os.path.join(archive.path, *parts)
+            relative_dir = os.path.dirname(member_path[len(prefix):])
+            if matcher.is_ignored(member_path[len(prefix):], False):
+                continue
+            groups.setdefault(relative_dir, []).append(
+                self._make_record(member_path, parts[-1], size, relative_dir, prefix))
+        return list(groups.items())
+
+    def _child_nodes(self, node: Tuple, subdirs: List[Tuple[str, str]], matcher: IgnoreMatcher,
+                     ancestors: frozenset) -> List[Tuple]:
+        """Subdirectories of a node that are within the depth limit"""
+        depth = node[2]
+        if self.max_depth is not None and depth >= self.max_depth:
+            return []
+        return [(path, relative_dir, depth + 1, matcher, ancestors) for path, relative_dir in subdirs]
+
+    def _scan_directory(self, node: Tuple, prefix: str) -> Tuple:
+        """List one directory.
+
+        Returns its file records, the subdirectories to visit, the ignore rules
+        that apply below it, the (st_dev, st_ino) of each record (None when
+        unknown or the file is not linked), the directory ids of the path down
+        to and including it, its own (st_dev, st_ino) and the number of entries
+        it lists. Symlinked files are returned as aliases of their target if it
+        lies in the walked tree.
+        """
+        dir_path, relative_dir, _, matcher, ancestors = node
+        listed_files, listed_subdirs, dir_id = self._list_directory(dir_path)
+        entries = len(listed_files) + len(listed_subdirs)
+
+        if dir_id is not None:
+            if dir_id in ancestors:
+                # Bind-mounted into its own subtree: entering it would never end
+                return [], [], matcher, [], ancestors, dir_id, entries
+            ancestors = ancestors | {dir_id}
+
+        if self.use_gitignore and any(f[0] == '.gitignore' for f in listed_files):
+            matcher = matcher.extend(relative_dir, os.path.join(dir_path, '.gitignore'))
+
+        files = []
+        file_ids = []
+        for name, size, _, inode, link, content_type, extension_hint in listed_files:
+            file_path = os.path.join(dir_path, name)
+            if matcher.is_ignored(file_path[len(prefix):], False):
+                continue
+            record = self._make_record(file_path, name, size, relative_dir, prefix,
+                                       content_type, extension_hint)
+            files.append(record)
+            file_id = None
+            if link != UNLINKED and inode and dir_id is not None:
+                # Files live on their directory's device unless a single file is bind-mounted
+                file_id = (dir_id[0], inode)
+                if link == SYMLINKED:
+                    record.alias_of = self._link_target(file_path, prefix)
+            file_ids.append(file_id)
+
+        subdirs = []
+        for name in listed_subdirs:
+            if name not in self.skip_dirs:
+                subdir_path = os.path.join(dir_path, name)
+                relative_subdir = subdir_path[len(prefix):]
+                # Ignored subtrees are never entered
+                if not matcher.is_ignored(relative_subdir, True):
+                    subdirs.append((subdir_path, relative_subdir))
+
+        return files, subdirs, matcher, file_ids, ancestors, dir_id, entries
+
+    def _list_directory(self, dir_path: str) -> Tuple[List[Tuple], List[str], Optional[Tuple[int, int]]]:
+        """Raw listing of a directory, its subdirectory names and its (st_dev, st_ino).
+
+        Files are (name, size, mtime_ns, inode, link kind, content type,
+        extension hint); the last two come from content sniffing and are None
+        when it is off.
+
+        With an index, a directory whose mtime is unchanged is answered from the
+        stored listing, so it is not listed again and only files that changed
+        since (see _refresh_listing) are sniffed again.
+        """
+        try:
+            dir_stat = os.stat(dir_path)
+        except OSError:
+            return [], [], None
+        dir_id = (dir_stat.st_dev, dir_stat.st_ino)
+
+        if self.index:
+            cached = self.index.get_listing(dir_path, dir_stat)
+            if cached is not None and (not cached['files'] or len(cached['files'][0]) == 7):
+                files, changed = self._refresh_listing(dir_path, cached['files'])
+                if changed:
+                    self.index.put_listing(dir_path, dir_stat, files, cached['subdirs'])
+                return files, cached['subdirs'], dir_id
+
+        files = []
+        subdirs = []
+
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+
+                    if is_dir:
+                        # Match os.walk: symlinked directories are neither files nor descended into
+                        if not entry.is_symlink():
+                            subdirs.append(entry.name)
+                        continue
+
+                    try:
+                        entry_stat = entry.stat()
+                        size = entry_stat.st_size
+                        mtime_ns, inode = entry_stat.st_mtime_ns, entry_stat.st_ino
+                        link = _link_kind(entry_stat, entry.is_symlink())
+                        mode = entry_stat.st_mode
+                    except OSError:
+                        # Broken symlink or file removed mid-scan
+                        size, mtime_ns, inode, link, mode = 0, 0, 0, UNLINKED, 0
+
+                    content_type, extension_hint = None, None
+                    if self._should_sniff(entry.name, size, mode):
+                        content_type, extension_hint = classify_file(entry.path)
+                    files.append((entry.name, size, mtime_ns, inode, link, content_type,
+                                  extension_hint))
+        except OSError:
+            # os.walk silently skips directories it cannot list
+            return [], [], None
+
+        if self.index:
+            self.index.put_listing(dir_path, dir_stat, files, subdirs)
+
+        return files, subdirs, dir_id
+
+    def _refresh_listing(self, dir_path: str, stored: List[List[Any]]) -> Tuple[List[Tuple], bool]:
+        """Bring the files of a stored listing up to date.
+
+        Editing a file in place leaves its directory's mtime alone, so every file
+        is stat'ed again; one whose size, mtime, inode or links changed gets the
+        new values and is sniffed again. Returns the files and whether any changed.
+        """
+        files = []
+        changed = False
+        for name, size, mtime_ns, inode, link, content_type, extension_hint in stored:
+            file_path = os.path.join(dir_path, name)
+            try:
+                file_stat = os.lstat(file_path)
+                is_symlink = stat.S_ISLNK(file_stat.st_mode)
+                if is_symlink:
+                    file_stat = os.stat(file_path)
+                current = (file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino,
+                           _link_kind(file_stat, is_symlink))
+                mode = file_stat.st_mode
+            except OSError:
+                current, mode = (0, 0, 0, 0), 0  # Broken symlink or file removed since
+            # A listing stored by a run without sniffing is sniffed now
+            unsniffed = content_type is None and self._should_sniff(name, current[0], mode)
+            if current != (size, mtime_ns, inode, link) or unsniffed:
+                changed = True
+                size, mtime_ns, inode, link = current
+                content_type, extension_hint = None, None
+                if self._should_sniff(name, size, mode):
+                    content_type, extension_hint = classify_file(file_path)
+            files.append((name, size, mtime_ns, inode, link, content_type, extension_hint))
+        return files, changed
+
+    def _link_target(self, file_path: str, prefix: str) -> Optional[str]:
+        """Path in the walked tree of a symlinked file's target, or None if the walk never gets there"""
+        target = os.path.realpath(file_path)
+        real_prefix = os.path.join(os.path.realpath(prefix), '')
+        if not target.startswith(real_prefix):
+            return None
+        relative_path = target[len(real_prefix):]
+        if any(part in self.skip_dirs for part in relative_path.split(os.sep)[:-1]):
+            return None
+        return prefix + relative_path
+
+    def _budget_exhausted(self) -> bool:
+        """Whether the walk has listed max_entries entries or passed its deadline"""
+        if self.max_entries is not None and self._entries >= self.max_entries:
+            return True
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def _should_sniff(self, name: str, size: int, mode: int) -> bool:
+        """Whether a file is read while walking, to find scripts its extension hides.
+
+        Extensionless files are checked, and files with an unknown extension if
+        they are executable (headers and libraries are not scripts). Known code
+        and data formats are taken at their word; a code file that is really
+        binary is caught when content_analysis reads it anyway.
+        """
+        if not self.sniff_content or size <= 0:
+            return False
+        extension = os.path.splitext(name)[1].lower()
+        if not extension:
+            return True
+        return (mode & 0o111 != 0
+                and extension not in self.code_extensions and extension not in self.data_extensions)
+
+    def _make_record(self, file_path: str, name: str, size: int, relative_dir: str, prefix: str,
+                     content_type: Optional[str] = None,
+                     extension_hint: Optional[str] = None) -> FileRecord:
+        """Build the file information record for a directory entry"""
+        file_ext = os.path.splitext(name)[1].lower()
+        is_code = file_ext in self.code_extensions
+        is_data = file_ext in self.data_extensions
+
+        if content_type == SCRIPT and not is_code:
+            # Shebang script; extensionless ones take the interpreter's extension
+            is_code = True
+            if not file_ext and extension_hint:
+                file_ext = extension_hint
+
+        return FileRecord(
+            path=file_path,
+            relative_start=len(prefix),
+            name=name,
+            extension=file_ext,
+            size=size,
+            is_code=is_code,
+            is_data=is_data,
+            directory=relative_dir,
+            content_type=content_type
+        )
+
+
+def _link_kind(file_stat: os.stat_result, is_symlink: bool) -> int:
+    """UNLINKED, HARDLINKED or SYMLINKED for a listed file"""
+    if is_symlink:
+        return SYMLINKED
+    return HARDLINKED if file_stat.st_nlink > 1 else UNLINKED
+
+
+class ScanTree:
+    """In-memory directory tree shared by every query of one run.
+
+    Directories are listed lazily on first use and then cached, so each one is
+    enumerated exactly once no matter how many callers ask about it. Safe to
+    query from several threads; concurrent requests for the same directory
+    wait for a single listing.
+    """
+
+    def __init__(self, walker: DirectoryWalker, root_path: str):
+        self.walker = walker
+        self.root_path = root_path
+        self.prefix = root_path if root_path.endswith(os.sep) else root_path + os.sep
+        # relative directory -> (files, relative subdirectories, ignore matcher, ancestor ids)
+        self.listings = {}
+        self.in_progress = {}  # relative directory -> threading.Event
+        self.lock = threading.Lock()
+
+    def relative(self, path: str) -> Optional[str]:
+        """Relative directory of path within the tree, or None if it lies outside"""
+        relative_dir = os.path.relpath(os.path.abspath(path), os.path.abspath(self.root_path))
+        if relative_dir == os.curdir:
+            return ''
+        if relative_dir == os.pardir or relative_dir.startswith(os.pardir + os.sep):
+            return None
+        return relative_dir
+
+    def files(self, relative_dir: str) -> List[FileRecord]:
+        """File records directly inside a directory"""
+        return self._listing(relative_dir)[0]
+
+    def subdirectories(self, relative_dir: str) -> List[str]:
+        """Relative paths of the subdirectories the walker would descend into"""
+        return self._listing(relative_dir)[1]
+
+    def walk(self, relative_dir: str = '', max_depth: Optional[int] = None) -> Iterator[FileRecord]:
+        """Yield the records below a directory in os.walk order, up to max_depth levels down"""
+        stack = [(relative_dir, 0)]
+        while stack:
+            current, depth = stack.pop()
+            yield from self.files(current)
+            if max_depth is None or depth < max_depth:
+                stack.extend((subdir, depth + 1) for subdir in reversed(self.subdirectories(current)))
+
+    def _listing(self, relative_dir: str) -> Tuple[List[FileRecord], List[str], IgnoreMatcher, frozenset]:
+        with self.lock:
+            if relative_dir in self.listings:
+                return self.listings[relative_dir]
+            event = self.in_progress.get(relative_dir)
+            owner = event is None
+            if owner:
+                event = self.in_progress[relative_dir] = threading.Event()
+
+        if not owner:
+            event.wait()
+            return self.listings[relative_dir]
+
+        listing = ([], [], self.walker.ignore, frozenset())
+        try:
+            if relative_dir:
+                # A directory inherits the ignore rules of its parent, and is
+                # only listed if the walker would have entered it
+                _, parent_subdirs, matcher, ancestors = self._listing(os.path.dirname(relative_dir))
+                if relative_dir in parent_subdirs:
+                    node = (os.path.join(self.root_path, relative_dir), relative_dir, 0, matcher,
+                            ancestors)
+                    files, subdirs, matcher, _, ancestors, _, _ = self.walker._scan_directory(
+                        node, self.prefix)
+                    listing = (files, [subdir for _, subdir in subdirs], matcher, ancestors)
+            else:
+                node = (self.root_path, '', 0, self.walker.ignore, frozenset())
+                files, subdirs, matcher, _, ancestors, _, _ = self.walker._scan_directory(
+                    node, self.prefix)
+                listing = (files, [subdir for _, subdir in subdirs], matcher, ancestors)
+        finally:
+            with self.lock:
+                self.listings[relative_dir] = listing
+                del self.in_progress[relative_dir]
+            event.set()
+
+        return listing
+
+
+class _WorkStealingScanner:
+    """Bounded thread pool that lists directories ahead of the walk.
+
+    Each worker owns a deque of pending directories: it pops its own newest
+    entry (depth-first, cache friendly) and, when empty, steals the oldest entry
+    of another worker (the largest remaining subtrees). Listings are kept until
+    the walk asks for them, so results come back in serial order. At most
+    READ_AHEAD_PER_WORKER listings per worker are held or in progress at a time;
+    if they are all for directories the walk does not need yet, the walk lists
+    the one it waits for itself.
+    """
+
+    # Listings per worker that may be buffered ahead of the walk
+    READ_AHEAD_PER_WORKER = 64
+
+    def __init__(self, walker: DirectoryWalker, prefix: str, workers: int):
+        self.walker = walker
+        self.prefix = prefix
+        self.queues = [deque() for _ in range(workers)]
+        self.results = {}
+        self.listing = set()  # Paths a worker is listing right now
+        self.window = workers * self.READ_AHEAD_PER_WORKER
+        self.outstanding = 0  # Listings in progress or waiting in results
+        self.pending = 0
+        self.stopped = False
+        self.condition = threading.Condition()
+        self.threads = [threading.Thread(target=self._work, args=(index,), daemon=True)
+                        for index in range(workers)]
+
+    def start(self, nodes: List[Tuple]):
+        """Begin listing the given stack of nodes (the last one is walked first)"""
+        self.queues[0].extend(nodes)
+        self.pending = len(nodes)
+        for thread in self.threads:
+            thread.start()
+
+    def result(self, dir_path: str) -> Tuple:
+        """Wait for and return the listing of a directory"""
+        node = None
+        with self.condition:
+            while dir_path not in self.results:
+                if self.outstanding >= self.window:
+                    node = self._claim(dir_path)
+                    if node is not None:
+                        break
+                self.condition.wait()
+            else:
+                outcome = self.results.pop(dir_path)
+                self.outstanding -= 1
+                self.condition.notify_all()
+        if node is not None:
+            outcome = self._list(node, 0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join()
+
+    def _claim(self, dir_path: str) -> Optional[Tuple]:
+        """Take a still queued directory out of the queues (called with the lock held)"""
+        for queue in self.queues:
+            for node in queue:
+                if node[0] == dir_path:
+                    queue.remove(node)
+                    return node
+        return None
+
+    def _take(self, index: int) -> Optional[Tuple]:
+        """Next directory for a worker, or None once the walk is finished"""
+        with self.condition:
+            while not self.stopped:
+                if self.outstanding < self.window:
+                    own = self.queues[index]
+                    node = own.pop() if own else next((queue.popleft() for queue in self.queues
+                                                       if queue), None)
+                    if node is not None:
+                        self.outstanding += 1
+                        self.listing.add(node[0])
+                        return node
+                if self.pending == 0:
+                    return None
+                self.condition.wait()
+            return None
+
+    def _work(self, index: int):
+        while True:
+            node = self._take(index)
+            if node is None:
+                return
+            outcome = self._list(node, index)
+            with self.condition:
+                self.results[node[0]] = outcome
+                self.listing.discard(node[0])
+                self.condition.notify_all()
+
+    def _list(self, node: Tuple, index: int):
+        """List a directory and queue its children on queue index; returns the listing or error"""
+        children = []
+        try:
+            outcome = self.walker._scan_directory(node, self.prefix)
+            children = self.walker._child_nodes(node, outcome[1], outcome[2], outcome[4])
+        except Exception as e:
+            outcome = e
+
+        with self.condition:
+            self.queues[index].extend(children)
+            self.pending += len(children) - 1
+            self.condition.notify_all()
+        return outcome
@@ -0,0 +1,243 @@
+"""
+graph_clustering.py
+
+Import-graph project clustering (--cluster=graph). Directory-based
+detection turns a package split across src/ and tests/, or across sibling
+folders, into several projects. This module resolves the imports and file
+references of every code file to files elsewhere in the scanned tree
+through a name index, and merges the projects those files ended up in
+with a union-find over the projects, so each connected component becomes
+one project.
+
+Python imports resolve by qualified module name, worked out from the
+__init__.py files of the scanned tree, so a vendored warnings.py inside
+some package is not mistaken for the standard library module. Other
+imports (require paths, #include files) and file references resolve by
+file name. Either way resolution is deliberately conservative: a name
+that matches files in the importer's own directory (under the same scan
+root, when several roots are scanned) resolves to those,
+otherwise it only resolves if exactly one file in the tree matches, so
+common names like utils or config do not chain unrelated projects together.
+
+Author: Stewart Geisz
+GitHub: StewartGeisz
+"""
+
+import os
+from collections import defaultdict
+from typing import List, Dict, Any, Iterator
+
+# Files whose imports are dotted Python module names
+PYTHON_EXTENSIONS = ('.py', '.ipynb')
+
+
+class UnionFind:
+    """Disjoint sets over 0..size-1 with union by size and path halving"""
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, first: int, second: int):
+        first, second = self.find(first), self.find(second)
+        if first == second:
+            return
+        if self.size[first] < self.size[second]:
+            first, second = second, first
+        self.parent[second] = first
+        self.size[first] += self.size[second]
+
+
+class NameIndex:
+    """The scanned files by the names imports and references use for them"""
+
+    def __init__(self, files: List[Dict[str, Any]]):
+        self.files = files
+        self.by_name = defaultdict(list)  # File name, and code file stem -> positions
+        self.by_module = defaultdict(list)  # Qualified Python module name -> positions
+        self.directories = [qualified_directory(f) for f in files]
+        self.package_dirs = {os.path.dirname(f['path']) for f in files if f['name'] == '__init__.py'}
+        self.packages = {}  # Directory -> qualified package name ('' if not a package)
+
+        for position, file_info in enumerate(files):
+            self.by_name[file_info['name']].append(position)
+            stem, extension = os.path.splitext(file_info['name'])
+            if file_info['is_code'] and stem:
+                self.by_name[stem].append(position)
+            if extension == '.py':
+                package = self.package_of(os.path.dirname(file_info['path']))
+                module = package if stem == '__init__' else '.'.join(filter(None, (package, stem)))
+                if module:
+                    self.by_module[module].append(position)
+
+    def package_of(self, directory: str) -> str:
+        """Qualified package name of a directory, from the __init__.py files above it"""
+        if directory not in self.packages:
+            if directory in self.package_dirs:
+                parent = self.package_of(os.path.dirname(directory))
+                name = os.path.basename(directory)
+                self.packages[directory] = f"{parent}.{name}" if parent else name
+            else:
+                self.packages[directory] = ''
+        return self.packages[directory]
+
+    def resolve(self, name: str, importer: Dict[str, Any], dotted: bool) -> List[int]:
+        """Files an import (dotted: a Python module name) or a reference resolves to.
+
+        Empty if nothing matches or the match is ambiguous.
+        """
+        if dotted:
+            keys, index = self._module_keys(name, importer), self.by_module
+        else:
+            keys, index = self._path_keys(name), self.by_name
+        for key in keys:
+            candidates = index.get(key)
+            if not candidates:
+                continue
+            directory = qualified_directory(importer)
+            local = [position for position in candidates if self.directories[position] == directory]
+            if local:
+                return local
+            if len(candidates) == 1:
+                return candidates
+            return []  # Ambiguous across directories
+        return []
+
+    def _module_keys(self, name: str, importer: Dict[str, Any]) -> Iterator[str]:
+        """The module an import names, then its packages ('pkg.mod.func' -> pkg.mod.func, pkg.mod, pkg)"""
+        level = len(name) - len(name.lstrip('.'))
+        components = [component for component in name[level:].split('.') if component]
+        if level:
+            # Relative to the importer's package
+            package = self.package_of(os.path.dirname(importer['path']))
+            base = package.split('.') if package else []
+            if level - 1 > len(base):
+                return
+            components = base[:len(base) - (level - 1)] + components
+        for end in range(len(components), 0, -1):
+            yield '.'.join(components[:end])
+
+    @staticmethod
+    def _path_keys(name: str) -> Iterator[str]:
+        """File name of a path-like import or reference; extensionless ones match code file stems"""
+        base = os.path.basename(name.replace('\\', '/'))
+        if base:
+            yield base
+
+
+def scan_root(file_info: Dict[str, Any]) -> str:
+    """The root a file was scanned under, with a trailing separator"""
+    path = file_info['path']
+    return path[:len(path) - len(file_info['relative_path'])]
+
+
+def qualified_directory(file_info: Dict[str, Any]) -> str:
+    """A file's directory prefixed with its scan root, so equal directories of two roots differ"""
+    return scan_root(file_info) + file_info['directory']
+
+
+def cluster_by_imports(organizer, projects: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge projects whose files import or reference each other.
+
+    Miscellaneous files are left where they are. Projects that stay on their
+    own keep their name and details; merged ones take the name and directory
+    of their largest part (the first of equal ones), so names stay unique, and
+    lay their files out below the directory the parts have in common.
+    When the projects come from several scan roots, their directories are
+    qualified by root, as the same relative directory can occur in each.
+    """
+    names = [name for name in projects if name != 'misc']
+    files = []
+    owners = []  # File index -> position in names of the first project listing it
+    seen = set()
+    roots = set()
+    for owner, name in enumerate(names):
+        for file_info in projects[name]['files']:
+            if file_info['path'] not in seen:
+                seen.add(file_info['path'])
+                files.append(file_info)
+                owners.append(owner)
+                roots.add(scan_root(file_info))
+
+    index = NameIndex(files)
+    components = UnionFind(len(names))
+    for position, file_info in enumerate(files):
+        if not file_info['is_code']:
+            continue
+        analysis = organizer.graph_analyses.get(file_info.get('alias_of') or file_info['path'])
+        if analysis is None:
+            analysis = organizer.analyze_record(file_info)
+        dotted = file_info['extension'] in PYTHON_EXTENSIONS
+        links = [(name, dotted) for name in analysis['imports']]
+        links.extend((name, False) for name in analysis.get('references', []))
+        for name, is_module in links:
+            for target in index.resolve(name, file_info, is_module):
+                components.union(owners[position], owners[target])
+
+    # Components in the order of their first project
+    groups = defaultdict(list)
+    for owner in range(len(names)):
+        groups[components.find(owner)].append(names[owner])
+
+    clustered = {}
+    for members in groups.values():
+        if len(members) == 1:
+            name, info = members[0], projects[members[0]]
+        else:
+            name = max(members, key=lambda member: len(projects[member]['files']))
+            info = _merge_members(organizer, [projects[member] for member in members],
+                                  projects[name])
+        if len(roots) > 1:
+            root = scan_root(next(iter(projects[name]['files'])))
+            info = dict(info, directory=root + info['directory'])
+        clustered[name] = info
+
+    if 'misc' in projects:
+        clustered['misc'] = projects['misc']
+    return clustered
+
+
+def _merge_members(organizer, members: List[Dict[str, Any]],
+                   lead: Dict[str, Any]) -> Dict[str, Any]:
+    """One project holding the files of members, in the directory of lead (one of them).
+
+    Its files keep their paths below the members' common directory (see output_path).
+    """
+    merged_files = []
+    seen = set()
+    for info in members:
+        for file_info in info['files']:
+            if file_info['path'] not in seen:
+                seen.add(file_info['path'])
+                merged_files.append(file_info)
+
+    code_files = [f for f in merged_files if f['is_code']]
+    languages = [organizer.detect_language(f['extension']) for f in code_files]
+    main_language = max(dict.fromkeys(languages), key=languages.count)
+    return {
+        'files': merged_files,
+        'main_language': main_language,
+        'description': f"Multi-file {main_language} project",
+        'directory': lead['directory'],
+        'layout_root': os.path.commonpath([qualified_directory(f) for f in merged_files])
+    }
+
+
+def output_path(file_info: Dict[str, Any], project_info: Dict[str, Any]) -> str:
+    """Where a file goes in its project's output folder.
+
+    Merged projects span several directories, whose files keep their paths below
+    the layout root, so equal names (__init__.py, conftest.py) stay apart and
+    packages still import; every other project is flat, by file name.
+    """
+    layout_root = project_info.get('layout_root')
+    if layout_root is None:
+        return file_info['name']
+    return os.path.relpath(file_info['path'], layout_root)
@@ -0,0 +1,159 @@
+"""
+ignore_rules.py
+
+Compiled .gitignore-style matcher used by the directory walker. Patterns from
+nested .gitignore files and user --exclude globs are translated to regular
+expressions once, and the walker consults them before descending, so ignored
+subtrees are never listed, stat'ed, analyzed or copied.
+
+Author: Stewart Geisz
+GitHub: StewartGeisz
+"""
+
+import os
+import re
+from typing import List, Optional, Tuple
+
+
+def translate_pattern(pattern: str) -> str:
+    """Translate a gitignore glob (without leading '!' or trailing '/') to a regex body"""
+    regex = ''
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '*':
+            if pattern[i:i + 3] == '**/':
+                regex += '(?:.*/)?'
+                i += 3
+                continue
+            if pattern[i:i + 2] == '**':
+                regex += '.*'
+                i += 2
+                continue
+            regex += '[^/]*'
+        elif char == '?':
+            regex += '[^/]'
+        elif char == '[':
+            end = pattern.find(']', i + 2 if pattern[i + 1:i + 2] in ('!', '^') else i + 1)
+            if end == -1:
+                regex += re.escape(char)
+            else:
+                body = pattern[i + 1:end]
+                if body[:1] in ('!', '^'):
+                    body = '^' + body[1:]
+                regex += '[' + body.replace('\\', '\\\\') + ']'
+                i = end
+        elif char == '\\' and i + 1 < len(pattern):
+            i += 1
+            regex += re.escape(pattern[i])
+        else:
+            regex += re.escape(char)
+        i += 1
+    return regex
+
+
+class IgnoreRules:
+    """The patterns of one .gitignore file (or --exclude list), relative to its directory"""
+
+    def __init__(self, base_dir: str, lines: List[str]):
+        # Relative directory the patterns are anchored at ('' for the root)
+        self.base_dir = base_dir.replace(os.sep, '/')
+        self.rules = []  # (compiled regex, negated, directory only)
+
+        for line in lines:
+            line = line.rstrip('\n').rstrip('\r')
+            if not line.endswith('\\ '):
+                line = line.rstrip(' ')
+            if not line or line.startswith('#'):
+                continue
+
+            negated = line.startswith('!')
+            if negated:
+                line = line[1:]
+            elif line.startswith('\\!') or line.startswith('\\#'):
+                line = line[1:]
+
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            if not line:
+                continue
+
+            body = translate_pattern(line.lstrip('/'))
+            if '/' in line:
+                regex = '^' + body + '$'  # Anchored to the .gitignore directory
+            else:
+                regex = '^(?:.*/)?' + body + '$'  # Matches the name at any depth
+            self.rules.append((re.compile(regex), negated, dir_only))
+
+        # Without negations, any match means ignored, so one alternation per kind is enough
+        self.has_negations = any(negated for _, negated, _ in self.rules)
+        if not self.has_negations:
+            self.any_pattern = self._combine([r for r, _, dir_only in self.rules])
+            self.file_pattern = self._combine([r for r, _, dir_only in self.rules if not dir_only])
+
+    @staticmethod
+    def _combine(regexes: List[re.Pattern]) -> Optional[re.Pattern]:
+        if not regexes:
+            return None
+        return re.compile('|'.join(f'(?:{r.pattern})' for r in regexes))
+
+    def match(self, relative_path: str, is_dir: bool) -> Optional[bool]:
+        """True if ignored, False if re-included by a negation, None if no pattern applies"""
+        if self.base_dir:
+            relative_path = relative_path[len(self.base_dir) + 1:]
+
+        if not self.has_negations:
+            pattern = self.any_pattern if is_dir else self.file_pattern
+            return True if pattern is not None and pattern.match(relative_path) else None
+
+        # Last matching pattern wins
+        for regex, negated, dir_only in reversed(self.rules):
+            if dir_only and not is_dir:
+                continue
+            if regex.match(relative_path):
+                return not negated
+        return None
+
+
+class IgnoreMatcher:
+    """User --exclude globs plus the chain of .gitignore rules from the scan root down"""
+
+    def __init__(self, excludes: Optional[IgnoreRules] = None,
+                 gitignores: Tuple[IgnoreRules, ...] = ()):
+        self.excludes = excludes
+        self.gitignores = gitignores
+
+    @classmethod
+    def from_excludes(cls, patterns: Optional[List[str]]) -> 'IgnoreMatcher':
+        """Matcher for user --exclude globs, anchored at the scan root"""
+        if not patterns:
+            return cls()
+        return cls(IgnoreRules('', list(patterns)))
+
+    def extend(self, base_dir: str, gitignore_path: str) -> 'IgnoreMatcher':
+        """Matcher for a subdirectory that contains its own .gitignore"""
+        try:
+            with open(gitignore_path, 'r', encoding='utf-8', errors='ignore') as f:
+                lines = f.readlines()
+        except OSError:
+            return self
+        rules = IgnoreRules(base_dir, lines)
+        if not rules.rules:
+            return self
+        return IgnoreMatcher(self.excludes, self.gitignores + (rules,))
+
+    def is_ignored(self, relative_path: str, is_dir: bool) -> bool:
+        """Whether a path relative to the scan root (using os.sep) is excluded"""
+        if self.excludes is None and not self.gitignores:
+            return False
+        if os.sep != '/':
+            relative_path = relative_path.replace(os.sep, '/')
+        # User excludes always win; .gitignore negations cannot re-include them
+        if self.excludes is not None and self.excludes.match(relative_path, is_dir):
+            return True
+        # Deeper .gitignore files take precedence over their parents
+        for rules in reversed(self.gitignores):
+            verdict = rules.match(relative_path, is_dir)
+            if verdict is not None:
+                return verdict
+        return False
@@ -0,0 +1,227 @@
+"""
+language_analyzers.py
+
+Per-language content analyzers, keyed by the language names the organizers'
+detect_language maps file extensions to. Each analyzer combines only the
+patterns that mean something in its language (no #include in SQL, no def in
+CSS) into one precompiled alternation with a named group per pattern, and
+may replace the import patterns with a parser. All analyzers are compiled
+once, when this module is imported; languages without an entry of their own
+(and 'Unknown') get the generic analyzer with every pattern.
+
+Each alternative consumes only its keyword and captures the rest with a
+lookahead, so text that one pattern matches is still scanned by the others
+(e.g. the quoted path in require('./x.js') is both an import and a
+reference), as it was with separate scans. A separate scan also never
+matched inside its own previous match, so the scanner drops a match that
+starts before the end of what the same pattern consumed last time (e.g. the
+second import of "import import x"); the results equal the separate
+re.findall scans. A leading lookahead on the first characters of the
+alternatives lets the engine skip every other position without trying each
+alternative there.
+
+Author: Stewart Geisz
+GitHub: StewartGeisz
+"""
+
+import ast
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+from notebook_stream import read_code_cells
+
+# Named group -> (analysis key, characters a match starts with, alternative); the order
+# within a key is the order the separate patterns used to be applied in
+PATTERNS = {
+    'import_name': ('imports', 'i', r"import\s+(?=(?P<import_name>[^\s]+))"),
+    'from_name': ('imports', 'f', r"from\s+(?=(?P<from_name>[^\s]+)\s+import)"),
+    'require_name': ('imports', 'r', r"require\((?=['\"](?P<require_name>[^'\"]+)['\"]\))"),
+    'include_name': ('imports', '#', r"\#include\s*(?=[<\"](?P<include_name>[^>\"]+)[>\"])"),
+    'def_name': ('functions', 'd', r"def\s+(?=(?P<def_name>[a-zA-Z_][a-zA-Z0-9_]*))"),
+    'function_name': ('functions', 'f',
+                      r"function\s+(?=(?P<function_name>[a-zA-Z_][a-zA-Z0-9_]*))"),
+    'class_name': ('functions', 'c', r"class\s+(?=(?P<class_name>[a-zA-Z_][a-zA-Z0-9_]*))"),
+    'reference': ('references', '\'"', r"['\"](?=(?P<reference>[^'\"\s]*\.[a-zA-Z0-9]+)['\"])"),
+}
+
+# Characters a separate pattern consumed after its named group that could start its own
+# next match: a reference's closing quote. What follows the other names (" import", "')",
+# '>') cannot begin the same pattern again.
+TAILS = {'reference': 1}
+
+KEYS = ('imports', 'functions', 'references')
+
+
+class LanguageAnalyzer:
+    """One language's patterns, compiled for both str and bytes input.
+
+    import_parser, if given, takes the decoded text and returns its imports,
+    or None to keep the pattern results (e.g. on a syntax error).
+
+    cell_reader, if given, extracts the code from a container format (the
+    cells of a notebook) as a list of sources, or returns None if the buffer
+    is not in that format. The patterns then run over the sources joined by
+    newlines, and import_parser receives the list instead of the text.
+
+    version is part of the analysis cache keys of the analyzer's results;
+    raise it whenever a change makes the analyzer return something else for
+    the same bytes, so results cached by earlier versions are not reused.
+    """
+
+    def __init__(self, groups: Tuple[str, ...],
+                 import_parser: Optional[Callable[..., Optional[List[str]]]] = None,
+                 cell_reader: Optional[Callable[..., Optional[List[str]]]] = None,
+                 version: int = 2):
+        self.groups = [name for name in PATTERNS if name in groups]
+        self.import_parser = import_parser
+        self.cell_reader = cell_reader
+        self.version = version
+        first_chars = ''.join(sorted({char for name in self.groups for char in PATTERNS[name][1]}))
+        source = '(?=[%s])(?:%s)' % (re.escape(first_chars),
+                                     '|'.join(PATTERNS[name][2] for name in self.groups))
+        self.pattern = re.compile(source, re.IGNORECASE)
+        # IGNORECASE is ASCII-only on bytes, like the keywords, and UTF-8 names are captured
+        # whole; only ASCII whitespace ends them (decoded text also splits at e.g. U+00A0)
+        self.bytes_pattern = re.compile(source.encode('ascii'), re.IGNORECASE)
+        # Group index -> position in self.groups, for dispatching on match.lastindex
+        self.slots = {self.pattern.groupindex[name]: slot for slot, name in enumerate(self.groups)}
+        self.tails = [TAILS.get(name, 0) for name in self.groups]
+
+    def scan_text(self, content: str) -> Dict[str, List[str]]:
+        """Extract imports, functions and references from text in one pass"""
+        buckets = [[] for _ in self.groups]
+        ends = [0] * len(self.groups)  # Where each separate pattern's previous match ended
+        slots, tails = self.slots, self.tails
+        for match in self.pattern.finditer(content):
+            index = match.lastindex
+            slot = slots[index]
+            if match.start() < ends[slot]:
+                continue  # Inside the previous match of the same pattern, as a separate scan skips it
+            ends[slot] = match.end(index) + tails[slot]
+            buckets[slot].append(match.group(index))
+        return self._merge(buckets)
+
+    def scan(self, buffer, end: int) -> Dict[str, List[str]]:
+        """scan_text for bytes-like buffers (bytes, mmap), up to offset end"""
+        buckets = [[] for _ in self.groups]
+        ends = [0] * len(self.groups)
+        slots, tails = self.slots, self.tails
+        for match in self.bytes_pattern.finditer(buffer, 0, end):
+            index = match.lastindex
+            slot = slots[index]
+            if match.start() < ends[slot]:
+                continue
+            ends[slot] = match.end(index) + tails[slot]
+            buckets[slot].append(match.group(index).decode('utf-8', 'ignore'))
+        return self._merge(buckets)
+
+    def _merge(self, buckets: List[List[str]]) -> Dict[str, List[str]]:
+        result = {key: [] for key in KEYS}
+        for name, bucket in zip(self.groups, buckets):
+            result[PATTERNS[name][0]].extend(bucket)
+        return result
+
+
+def python_imports(source: str) -> Optional[List[str]]:
+    """Modules imported by Python source, in source order, or None if it does not parse.
+
+    "from pkg import a, b" yields pkg, pkg.a and pkg.b; relative imports keep
+    their leading dots. Source without the import keyword is not parsed.
+    """
+    if 'import' not in source:
+        return []
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):  # ValueError: null bytes in the source
+        return None
+
+    imports = []
+    for node in _import_statements(tree.body):
+        if isinstance(node, ast.Import):
+            imports.extend(alias.name for alias in node.names)
+            continue
+        module = '.' * node.level + (node.module or '')
+        if node.module:
+            imports.append(module)
+        prefix = module + '.' if node.module else module
+        imports.extend(prefix + alias.name for alias in node.names if alias.name != '*')
+    return imports
+
+
+# Fields of compound statements (and except handlers, match cases) that hold
+# statement lists, in the order they appear in the source
+BODY_FIELDS = ('body', 'handlers', 'orelse', 'finalbody', 'cases')
+
+
+def _import_statements(statements: List[ast.AST]):
+    """Import statements among statements and their nested blocks, in source order.
+
+    Imports are statements, so expressions are never descended into.
+    """
+    for node in statements:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            yield node
+            continue
+        for field in BODY_FIELDS:
+            nested = getattr(node, field, None)
+            if isinstance(nested, list):
+                yield from _import_statements(nested)
+
+
+def notebook_imports(cells: List[str]) -> List[str]:
+    """python_imports over the code cell sources of a .ipynb (see read_code_cells).
+
+    IPython magics and shell escapes are blanked out first; a cell that still
+    does not parse falls back to the Python patterns on its own.
+    """
+    imports = []
+    for source in cells:
+        lines = ['' if line.lstrip().startswith(('%', '!')) else line
+                 for line in source.split('\n')]
+        source = '\n'.join(lines)
+        cell_imports = python_imports(source)
+        if cell_imports is None:
+            cell_imports = PYTHON.scan_text(source)['imports']
+        imports.extend(cell_imports)
+    return imports
+
+
+GENERIC = LanguageAnalyzer(tuple(PATTERNS))
+
+PYTHON = LanguageAnalyzer(('import_name', 'from_name', 'def_name', 'class_name', 'reference'),
+                          python_imports)
+
+# detect_language name -> analyzer
+ANALYZERS = {
+    'Python': PYTHON,
+    'Jupyter Notebook': LanguageAnalyzer(PYTHON.groups, notebook_imports, read_code_cells),
+    'JavaScript': LanguageAnalyzer(('import_name', 'require_name', 'function_name', 'class_name',
+                                    'reference')),
+    'TypeScript': LanguageAnalyzer(('import_name', 'require_name', 'function_name', 'class_name',
+                                    'reference')),
+    'Java': LanguageAnalyzer(('import_name', 'class_name', 'reference')),
+    'Kotlin': LanguageAnalyzer(('import_name', 'class_name', 'reference')),
+    'Scala': LanguageAnalyzer(('import_name', 'def_name', 'class_name', 'reference')),
+    'Swift': LanguageAnalyzer(('import_name', 'class_name', 'reference')),
+    'Go': LanguageAnalyzer(('import_name', 'reference')),
+    'C': LanguageAnalyzer(('include_name', 'reference')),
+    'C++': LanguageAnalyzer(('include_name', 'class_name', 'reference')),
+    'C#': LanguageAnalyzer(('class_name', 'reference')),
+    'PHP': LanguageAnalyzer(('require_name', 'function_name', 'class_name', 'reference')),
+    'Ruby': LanguageAnalyzer(('require_name', 'def_name', 'class_name', 'reference')),
+    'Perl': LanguageAnalyzer(('require_name', 'reference')),
+    'Shell': LanguageAnalyzer(('function_name', 'reference')),
+    'MATLAB': LanguageAnalyzer(('function_name', 'reference')),
+    'R': LanguageAnalyzer(('reference',)),
+    'Rust': LanguageAnalyzer(('reference',)),
+    'SQL': LanguageAnalyzer(('function_name', 'reference')),
+    'HTML': LanguageAnalyzer(('import_name', 'require_name', 'function_name', 'reference')),
+    'CSS': LanguageAnalyzer(('import_name', 'reference')),
+    'JSON': LanguageAnalyzer(('reference',)),
+    'YAML': LanguageAnalyzer(('reference',)),
+}
+
+
+def analyzer_for(language: str) -> LanguageAnalyzer:
+    """The analyzer registered for a detect_language name, or the generic one"""
+    return ANALYZERS.get(language, GENERIC)
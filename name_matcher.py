@@ -0,0 +1,95 @@
+"""
+name_matcher.py
+
+Aho-Corasick automaton for asking whether a string contains any of a set
+of names, as analyze_project_cohesion does for every import against the
+module names of a directory group. The automaton is built once per group
+and then reads each string a single time, so checking all imports is linear
+in their total length however many names the group has.
+
+NamePrefixIndex answers the opposite question for file names: which names
+start with a given prefix (or equal a given name), found by binary search
+over the sorted names instead of a scan of the whole directory.
+
+Author: Stewart Geisz
+GitHub: StewartGeisz
+"""
+
+from bisect import bisect_left
+from collections import deque
+from typing import Iterable, List
+
+
+class NameMatcher:
+    def __init__(self, names: Iterable[str]):
+        # State 0 is the root; goto[state] maps a character to the next state
+        self.goto = [{}]
+        self.fail = [0]
+        self.matches = [False]  # Whether some name ends at (or is a suffix of) a state
+        for name in names:
+            self._add(name)
+        self._link()
+
+    def _add(self, name: str):
+        state = 0
+        for char in name:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.matches.append(False)
+            state = next_state
+        self.matches[state] = True  # An empty name makes the root match everything
+
+    def _link(self):
+        """Breadth-first failure links: the longest proper suffix that is also a prefix"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.matches[next_state] = self.matches[next_state] or self.matches[self.fail[next_state]]
+
+    def search(self, text: str) -> bool:
+        """Whether text contains any of the names"""
+        goto, fail, matches = self.goto, self.fail, self.matches
+        if matches[0]:
+            return True
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if matches[state]:
+                return True
+        return False
+
+
+class NamePrefixIndex:
+    def __init__(self, names: Iterable[str]):
+        entries = sorted((name, position) for position, name in enumerate(names))
+        self.names = [name for name, _ in entries]
+        self.positions = [position for _, position in entries]
+
+    def starting_with(self, prefix: str) -> List[int]:
+        """Positions of the names that start with prefix, in their original order"""
+        names = self.names
+        start = end = bisect_left(names, prefix)
+        while end < len(names) and names[end].startswith(prefix):
+            end += 1
+        return sorted(self.positions[start:end])
+
+    def named(self, name: str) -> List[int]:
+        """Positions of the names equal to name, in their original order"""
+        names = self.names
+        start = end = bisect_left(names, name)
+        while end < len(names) and names[end] == name:
+            end += 1
+        return self.positions[start:end]
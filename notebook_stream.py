@@ -0,0 +1,167 @@
+"""
+notebook_stream.py
+
+Streaming reader for the code cells of Jupyter notebooks. A notebook with
+plot outputs can be hundreds of megabytes of base64 in JSON, of which only
+the code cell sources matter for project detection. read_code_cells walks
+the JSON with a few anchored patterns over the (memory-mapped) buffer:
+only keys, cell types and code cell sources are decoded, and everything
+else, outputs and attachments included, is stepped over by match offsets
+without ever being copied out of the buffer.
+
+Author: Stewart Geisz
+GitHub: StewartGeisz
+"""
+
+import json
+import re
+from typing import Iterator, List, Optional
+
+_WHITESPACE = re.compile(rb'[ \t\r\n]*')
+_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_LITERAL = re.compile(rb'[^,\]}\s]+')
+# One token of a nested value: a string, a bracket, or a run of anything else
+_TOKEN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{}]|[^"\[\]{}]+', re.DOTALL)
+
+_OPENERS = b'[{'
+
+
+class _Malformed(Exception):
+    """The buffer is not the JSON the reader expected"""
+
+
+class _JsonReader:
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.pos = 0
+
+    def peek(self) -> bytes:
+        self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+        return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char: bytes):
+        if self.peek() != char:
+            raise _Malformed(f"expected {char!r} at offset {self.pos}")
+        self.pos += 1
+
+    def string(self) -> str:
+        self.peek()
+        match = _STRING.match(self.buffer, self.pos)
+        if match is None:
+            raise _Malformed(f"expected a string at offset {self.pos}")
+        self.pos = match.end()
+        try:
+            return json.loads(match.group())
+        except ValueError as e:
+            raise _Malformed(str(e))
+
+    def keys(self) -> Iterator[str]:
+        """Keys of an object; the caller reads or skips each value before the next key"""
+        self.expect(b'{')
+        if self.peek() == b'}':
+            self.pos += 1
+            return
+        while True:
+            key = self.string()
+            self.expect(b':')
+            yield key
+            separator = self.peek()
+            self.pos += 1
+            if separator == b'}':
+                return
+            if separator != b',':
+                raise _Malformed(f"expected ',' or '}}' at offset {self.pos - 1}")
+
+    def items(self) -> Iterator[None]:
+        """Elements of an array; the caller reads or skips each one"""
+        self.expect(b'[')
+        if self.peek() == b']':
+            self.pos += 1
+            return
+        while True:
+            yield
+            separator = self.peek()
+            self.pos += 1
+            if separator == b']':
+                return
+            if separator != b',':
+                raise _Malformed(f"expected ',' or ']' at offset {self.pos - 1}")
+
+    def text(self) -> Optional[str]:
+        """A string, or the concatenation of an array of strings (a cell source); None otherwise"""
+        first = self.peek()
+        if first == b'"':
+            return self.string()
+        if first == b'[':
+            parts = []
+            for _ in self.items():
+                if self.peek() != b'"':
+                    self.skip()
+                    continue
+                parts.append(self.string())
+            return ''.join(parts)
+        self.skip()
+        return None
+
+    def skip(self):
+        """Step over one value without decoding it"""
+        first = self.peek()
+        if first == b'"':
+            match = _STRING.match(self.buffer, self.pos)
+        elif first and first in _OPENERS:
+            depth = 0
+            while True:
+                match = _TOKEN.match(self.buffer, self.pos)
+                if match is None:
+                    raise _Malformed(f"unterminated value at offset {self.pos}")
+                self.pos = match.end()
+                char = self.buffer[match.start():match.start() + 1]
+                if char in (b'[', b'{'):
+                    depth += 1
+                elif char in (b']', b'}'):
+                    depth -= 1
+                    if depth == 0:
+                        return
+        else:
+            match = _LITERAL.match(self.buffer, self.pos)
+        if match is None:
+            raise _Malformed(f"expected a value at offset {self.pos}")
+        self.pos = match.end()
+
+
+def read_code_cells(buffer, max_bytes: Optional[int] = None) -> Optional[List[str]]:
+    """Sources of the code cells of a notebook, in order.
+
+    buffer is any bytes-like object, typically an mmap of the .ipynb.
+    Collecting stops once max_bytes of source have been read. A notebook
+    that is cut short (e.g. a capped archive read) or otherwise malformed
+    yields the cells read so far, and is never decoded in full; None means
+    the buffer has no top-level "cells" array at all.
+    """
+    reader = _JsonReader(buffer)
+    cells = []
+    collected = 0
+    found = False
+    try:
+        for key in reader.keys():
+            if key != 'cells':
+                reader.skip()
+                continue
+            found = True
+            for _ in reader.items():
+                cell_type = source = None
+                for cell_key in reader.keys():
+                    if cell_key == 'cell_type':
+                        cell_type = reader.text()
+                    elif cell_key == 'source' and cell_type in (None, 'code'):
+                        source = reader.text()
+                    else:
+                        reader.skip()
+                if cell_type == 'code' and source:
+                    cells.append(source)
+                    collected += len(source)
+                    if max_bytes and collected >= max_bytes:
+                        return cells
+    except _Malformed:
+        pass
+    return cells if found else None
@@ -29,19 +29,68 @@ import argparse
 import subprocess
 import shutil
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Set, Tuple
+from typing import List, Dict, Any, Optional, Set, Tuple, Iterable, Iterator, Union
 from dotenv import load_dotenv
 from collections import defaultdict
-import re
+
+from analysis_cache import AnalysisCache, DEFAULT_CACHE_BYTES
+from archive_reader import close_archives
+from content_analysis import DEFAULT_MAX_ANALYSIS_BYTES, analysis_version, scan_file
+from file_scanner import DirectoryWalker, copy_file_record
+from graph_clustering import cluster_by_imports, output_path
+from ignore_rules import IgnoreMatcher
+from name_matcher import NameMatcher, NamePrefixIndex
+from parallel_analysis import prefetch_analyses
+from record_spool import RecordSpool
+from scan_checkpoint import clear_checkpoints
+from scan_index import ScanIndex
+from sharded_scan import detect_projects_sharded
+from watch_mode import ProjectWatchSession
 
 # Load environment variables
 load_dotenv()
 
 
 class AllInOneOrganizer:
-    def __init__(self, github_username: str = "StewartGeisz", output_dir: str = "organized_projects"):
+    def __init__(self, github_username: str = "StewartGeisz", output_dir: str = "organized_projects",
+                 workers: int = 1, index_path: Optional[str] = None,
+                 exclude: Optional[List[str]] = None, use_gitignore: bool = True,
+                 sniff_content: bool = True, scan_archives: bool = False, processes: int = 1,
+                 max_scan_seconds: Optional[float] = None, max_entries: Optional[int] = None,
+                 checkpoint_dir: Optional[str] = None, resume: bool = False,
+                 max_analysis_bytes: Optional[int] = DEFAULT_MAX_ANALYSIS_BYTES,
+                 analysis_cache_path: Optional[str] = None,
+                 analysis_cache_bytes: int = DEFAULT_CACHE_BYTES, jobs: int = 1,
+                 cluster: str = 'directory'):
         self.github_username = github_username
         self.output_dir = output_dir
+        self.workers = workers  # Threads used for directory traversal
+        self.processes = processes  # Processes that scan and analyze shards of the input roots
+        self.jobs = jobs  # Processes that analyze file contents during project detection
+        # Persistent scan index. When other processes share it (and the analysis cache),
+        # every write is committed at once, so no process holds the write lock for long
+        shared = processes > 1 or jobs > 1
+        self.index = ScanIndex(index_path, autocommit=shared) if index_path else None
+        self.exclude = exclude or []  # Extra gitignore-style globs to skip while scanning
+        self.use_gitignore = use_gitignore
+        self.sniff_content = sniff_content  # Classify files by content, not just extension
+        self.scan_archives = scan_archives  # Read .zip/.tar members as virtual directories
+        self.alias_analyses = {}  # First path of a hardlinked/bind-mounted file -> its analysis
+        self.max_scan_seconds = max_scan_seconds  # Wall-clock budget for one scan
+        self.max_entries = max_entries  # Directory entry budget for one scan (per shard)
+        self.scan_deadline = None
+        self.scan_truncated = False  # Whether the last scan stopped on its budget
+        self.skipped_subtrees = []  # Directories the last scan left for a follow-up run
+        self.checkpoint_dir = checkpoint_dir  # Where scans save progress for --resume
+        self.resume = resume
+        self.max_analysis_bytes = max_analysis_bytes  # Bytes of each file examined (0: all)
+        # Analysis results shared by all files with the same content, across runs
+        self.analysis_cache = (AnalysisCache(analysis_cache_path, analysis_cache_bytes,
+                                             autocommit=shared)
+                               if analysis_cache_path else None)
+        self.prefetched_analyses = {}  # Path -> analysis computed ahead by the --jobs pool
+        self.cluster = cluster  # 'directory', or 'graph' to merge projects along imports
+        self.graph_analyses = {}  # Path -> analysis, kept for the import graph
         self.gh_command = None
         
         # File extensions
@@ -91,6 +140,34 @@ class AllInOneOrganizer:
         print("  Install GitHub CLI and authenticate for full functionality.")
         return True  # Continue without GitHub CLI
 
+    def create_walker(self) -> DirectoryWalker:
+        """Directory walker configured with this organizer's scan options"""
+        return DirectoryWalker(self.supported_code_extensions, self.data_extensions,
+                               workers=self.workers, index=self.index,
+                               ignore=IgnoreMatcher.from_excludes(self.exclude),
+                               use_gitignore=self.use_gitignore,
+                               sniff_content=self.sniff_content,
+                               scan_archives=self.scan_archives,
+                               max_entries=self.max_entries, deadline=self.scan_deadline,
+                               checkpoint_dir=self.checkpoint_dir, resume=self.resume)
+
+    def start_scan_budget(self):
+        """Start the --max-scan-seconds clock and clear the previous truncation report"""
+        self.scan_deadline = time.time() + self.max_scan_seconds if self.max_scan_seconds else None
+        self.scan_truncated = False
+        self.skipped_subtrees = []
+
+    def record_truncation(self, directory_path: str, skipped: List[str]):
+        """Remember the subtrees of directory_path a budgeted scan did not finish"""
+        self.scan_truncated = True
+        paths = [os.path.join(directory_path, relative_dir) if relative_dir else directory_path
+                 for relative_dir in skipped]
+        self.skipped_subtrees.extend(paths)
+        print(f"WARNING: Scan budget exhausted in {directory_path}; "
+              f"{len(skipped)} subtrees skipped (partial results):")
+        for path in paths:
+            print(f"  SKIPPED: {path}")
+
     def scan_and_analyze_files(self, directory_path: str) -> List[Dict[str, Any]]:
         """Scan directory and analyze files"""
         if not os.path.exists(directory_path) or not os.path.isdir(directory_path):
@@ -100,33 +177,59 @@ class AllInOneOrganizer:
         files_info = []
         print(f"Scanning directory: {directory_path}")
         
-        for root, dirs, files in os.walk(directory_path):
-            # Skip common non-project directories
-            dirs[:] = [d for d in dirs if d not in [
-                '.git', '__pycache__', 'node_modules', '.venv', 'venv', 'env',
-                '.pytest_cache', 'dist', 'build', 'target', '.idea', '.vscode'
-            ]]
-            
-            for file in files:
-                file_path = os.path.join(root, file)
-                file_ext = os.path.splitext(file)[1].lower()
-                relative_path = os.path.relpath(file_path, directory_path)
-                
-                file_info = {
-                    'path': file_path,
-                    'relative_path': relative_path,
-                    'name': file,
-                    'extension': file_ext,
-                    'size': os.path.getsize(file_path) if os.path.exists(file_path) else 0,
-                    'is_code': file_ext in self.supported_code_extensions,
-                    'is_data': file_ext in self.data_extensions,
-                    'directory': os.path.dirname(relative_path)
-                }
-                files_info.append(file_info)
+        self.start_scan_budget()
+        walker = self.create_walker()
+        files_info.extend(walker.walk(directory_path))
+        if walker.truncated:
+            self.record_truncation(directory_path, walker.skipped_subtrees)
                 
         print(f"Found {len(files_info)} files")
         return files_info
 
+    def scan_directory_groups(self, directory_path: str) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """Scan directory lazily, yielding (relative directory, files) as each directory is finished"""
+        if not os.path.exists(directory_path) or not os.path.isdir(directory_path):
+            print(f"ERROR: Directory not found: {directory_path}")
+            return
+
+        print(f"Scanning directory: {directory_path}")
+        
+        self.start_scan_budget()
+        walker = self.create_walker()
+        total_files = 0
+        for directory, dir_files in walker.walk_groups(directory_path):
+            total_files += len(dir_files)
+            yield directory, dir_files
+        if walker.truncated:
+            self.record_truncation(directory_path, walker.skipped_subtrees)
+                
+        print(f"Found {total_files} files")
+
+    def detect_projects_in_roots(self, input_directories: List[str]) -> Dict[str, Any]:
+        """Scan one or more roots and detect projects, sharded across processes if configured"""
+        if len(input_directories) == 1 and self.processes <= 1:
+            # File lists go to disk as projects are detected; removed with the last reference
+            projects = self.detect_projects_from_groups(self.scan_directory_groups(input_directories[0]),
+                                                        spool=RecordSpool())
+        else:
+            self.start_scan_budget()
+            for directory in input_directories:
+                print(f"Scanning directory: {directory}")
+            print("Analyzing files for project detection...")
+            projects = detect_projects_sharded(self, input_directories, self.processes)
+            print(f"Detected {len(projects)} projects")
+        if self.cluster == 'graph':
+            projects = cluster_by_imports(self, projects)
+            self.graph_analyses = {}
+            print(f"Merged along imports into {len(projects)} projects")
+        self.finish_checkpoints(input_directories)
+        return projects
+
+    def finish_checkpoints(self, input_directories: List[str]):
+        """Drop the roots' scan checkpoints after a complete scan; keep them after a truncated one"""
+        if self.checkpoint_dir and not self.scan_truncated:
+            clear_checkpoints(self.checkpoint_dir, input_directories)
+
     def detect_language(self, extension: str) -> str:
         """Detect programming language from file extension"""
         language_map = {
@@ -140,6 +243,22 @@ class AllInOneOrganizer:
         }
         return language_map.get(extension.lower(), 'Unknown')
 
+    def analyze_record(self, file_info: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyze a scanned file; aliases of the same inode share one analysis"""
+        source = file_info.get('alias_of')
+        key = source or file_info['path']
+        analysis = self.prefetched_analyses.get(key)
+        if analysis is None:
+            if source is None:
+                analysis = self.analyze_file_content(key)
+            else:
+                if source not in self.alias_analyses:
+                    self.alias_analyses[source] = self.analyze_file_content(source)
+                analysis = self.alias_analyses[source]
+        if self.cluster == 'graph':
+            self.graph_analyses[key] = analysis  # Reused when the import graph is built
+        return analysis
+
     def analyze_file_content(self, file_path: str) -> Dict[str, Any]:
         """Analyze file content for project relationships"""
         analysis = {
@@ -149,36 +268,30 @@ class AllInOneOrganizer:
             'keywords': []
         }
         
+        language = self.detect_language(os.path.splitext(file_path)[1])
+        version = analysis_version(language, self.max_analysis_bytes)
+        file_stat = None
+        if self.index:
+            # Reuse the stored results while size, mtime, inode and analysis version are unchanged
+            try:
+                file_stat = os.stat(file_path)
+            except OSError:
+                pass
+            else:
+                cached = self.index.get_analysis(file_path, file_stat, version)
+                if cached is not None:
+                    return cached
+        
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-                
-                # Extract imports
-                import_patterns = [
-                    r'import\s+([^\s]+)',
-                    r'from\s+([^\s]+)\s+import',
-                    r'require\([\'"]([^\'"]+)[\'"]\)',
-                    r'#include\s*[<"]([^>"]+)[>"]'
-                ]
-                
-                for pattern in import_patterns:
-                    matches = re.findall(pattern, content, re.IGNORECASE)
-                    analysis['imports'].extend(matches)
-                
-                # Extract function/class definitions
-                func_patterns = [
-                    r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)',
-                    r'function\s+([a-zA-Z_][a-zA-Z0-9_]*)',
-                    r'class\s+([a-zA-Z_][a-zA-Z0-9_]*)'
-                ]
-                
-                for pattern in func_patterns:
-                    matches = re.findall(pattern, content, re.IGNORECASE)
-                    analysis['functions'].extend(matches)
-                
-                # Look for file references
-                file_refs = re.findall(r'[\'"]([^\'"\s]*\.[a-zA-Z0-9]+)[\'"]', content)
-                analysis['references'] = [ref for ref in file_refs if '.' in ref]
+            # Imports, function/class names and file references in one pass of the
+            # language's analyzer over the memory-mapped file, up to max_analysis_bytes
+            matches, _ = scan_file(file_path, self.max_analysis_bytes, self.analysis_cache, language)
+            analysis['imports'].extend(matches['imports'])
+            analysis['functions'].extend(matches['functions'])
+            analysis['references'] = matches['references']
+            
+            if file_stat is not None:
+                self.index.put_analysis(file_path, file_stat, version, analysis)
                 
         except Exception as e:
             pass  # Silent fail for unreadable files
@@ -187,17 +300,32 @@ class AllInOneOrganizer:
 
     def detect_projects(self, files_info: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
         """Detect and group files into projects"""
-        print("Analyzing files for project detection...")
-        
         # Group files by directory first
         directory_groups = defaultdict(list)
         for file_info in files_info:
             directory_groups[file_info['directory']].append(file_info)
         
+        return self.detect_projects_from_groups(directory_groups.items())
+
+    def detect_projects_from_groups(self, directory_groups: Iterable[Tuple[str, List[Dict[str, Any]]]],
+                                    verbose: bool = True,
+                                    spool: Optional[RecordSpool] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Detect projects from (directory, files) groups, e.g. as yielded by scan_directory_groups.
+
+        With a spool, each project's files are written to it as the project is
+        detected (miscellaneous files to a spool of their own), so only the
+        current directory's records are held in memory.
+        """
+        if verbose:
+            print("Analyzing files for project detection...")
+        if self.jobs > 1:
+            directory_groups = prefetch_analyses(self, directory_groups, self.jobs)
+        
         projects = {}
         misc_files = []
+        misc_spool = RecordSpool(os.path.dirname(spool.path)) if spool else None
         
-        for directory, dir_files in directory_groups.items():
+        for directory, dir_files in directory_groups:
             code_files = [f for f in dir_files if f['is_code']]
             
             if len(code_files) >= 1:  # At least one code file makes it a project
@@ -206,32 +334,38 @@ class AllInOneOrganizer:
                 if project_analysis['is_cohesive']:
                     project_name = self.generate_project_name(directory, code_files)
                     projects[project_name] = {
-                        'files': dir_files,
+                        'files': spool.store(dir_files) if spool else dir_files,
                         'main_language': project_analysis['main_language'],
                         'description': project_analysis['description'],
                         'directory': directory
                     }
                 else:
                     # Split into individual projects
-                    for code_file in code_files:
+                    names = NamePrefixIndex(f['name'] for f in dir_files)
+                    for code_file, analysis in zip(code_files, project_analysis['analyses']):
                         file_name = os.path.splitext(code_file['name'])[0]
                         project_name = f"{file_name}_project"
                         
                         # Include related files
                         related_files = [code_file]
-                        related_files.extend([f for f in dir_files if 
-                                            f['name'].startswith(file_name) and f != code_file])
+                        related_files.extend(self.related_files(code_file, file_name, analysis,
+                                                                dir_files, names))
                         
                         projects[project_name] = {
-                            'files': related_files,
+                            'files': spool.store(related_files) if spool else related_files,
                             'main_language': self.detect_language(code_file['extension']),
                             'description': f"Project based on {code_file['name']}",
                             'directory': directory
                         }
             else:
                 # No code files - add to misc
-                misc_files.extend(dir_files)
+                if misc_spool:
+                    misc_spool.store(dir_files)
+                else:
+                    misc_files.extend(dir_files)
         
+        if misc_spool:
+            misc_files = misc_spool.all()
         if misc_files:
             projects['misc'] = {
                 'files': misc_files,
@@ -240,7 +374,8 @@ class AllInOneOrganizer:
                 'directory': 'misc'
             }
         
-        print(f"Detected {len(projects)} projects")
+        if verbose:
+            print(f"Detected {len(projects)} projects")
         return projects
 
     def analyze_project_cohesion(self, code_files: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -254,15 +389,17 @@ class AllInOneOrganizer:
         
         languages = set()
         cross_references = 0
+        # Imports that mention any of the group's module names, in one pass per import
+        file_names = NameMatcher(os.path.splitext(f['name'])[0] for f in code_files)
         
+        analyses = []
         for file_info in code_files:
             languages.add(self.detect_language(file_info['extension']))
-            analysis = self.analyze_file_content(file_info['path'])
+            analysis = self.analyze_record(file_info)
+            analyses.append(analysis)
             
             # Check for cross-references
-            file_names = {os.path.splitext(f['name'])[0] for f in code_files}
-            cross_references += sum(1 for imp in analysis['imports'] 
-                                  if any(name in imp for name in file_names))
+            cross_references += sum(1 for imp in analysis['imports'] if file_names.search(imp))
         
         # Determine cohesion
         is_cohesive = (
@@ -277,9 +414,25 @@ class AllInOneOrganizer:
         return {
             'is_cohesive': is_cohesive,
             'main_language': main_language,
-            'description': f"Multi-file {main_language} project"
+            'description': f"Multi-file {main_language} project",
+            'analyses': analyses  # Per code file, for linking referenced files
         }
 
+    def related_files(self, code_file: Dict[str, Any], file_name: str, analysis: Dict[str, Any],
+                      dir_files: List[Dict[str, Any]], names: NamePrefixIndex) -> List[Dict[str, Any]]:
+        """Files of the directory that share a code file's name prefix or that it references"""
+        related = [dir_files[position] for position in names.starting_with(file_name)
+                   if dir_files[position]['name'] != code_file['name']]
+        seen = {f['name'] for f in related}
+        seen.add(code_file['name'])
+        for reference in analysis['references']:
+            for position in names.named(os.path.basename(reference)):
+                referenced = dir_files[position]
+                if not referenced['is_code'] and referenced['name'] not in seen:
+                    seen.add(referenced['name'])
+                    related.append(referenced)
+        return related
+
     def generate_project_name(self, directory: str, code_files: List[Dict[str, Any]]) -> str:
         """Generate a meaningful project name"""
         if directory and directory != '.':
@@ -310,8 +463,16 @@ class AllInOneOrganizer:
         os.makedirs(self.output_dir, exist_ok=True)
         
         project_paths = {}
+        copied = {}  # Source path -> first copy, so hardlinked duplicates are linked again
+        # Sources other files are inode aliases of; the only ones linked across directories
+        aliased = {f['alias_of'] for info in projects.values() for f in info['files'] if f.get('alias_of')}
+        directory = None
         
         for project_name, project_info in projects.items():
+            if project_info['directory'] != directory:
+                # A file shared by the split projects of one directory is linked within it
+                directory = project_info['directory']
+                copied = {source: copy for source, copy in copied.items() if source in aliased}
             project_dir = os.path.join(self.output_dir, project_name)
             os.makedirs(project_dir, exist_ok=True)
             project_paths[project_name] = project_dir
@@ -320,14 +481,17 @@ class AllInOneOrganizer:
             
             # Copy files to project directory
             for file_info in project_info['files']:
-                src_path = file_info['path']
-                dst_path = os.path.join(project_dir, file_info['name'])
+                file_path = output_path(file_info, project_info)
+                dst_path = os.path.join(project_dir, file_path)
                 
                 try:
-                    shutil.copy2(src_path, dst_path)
+                    if file_path != file_info['name']:
+                        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+                    copy_file_record(file_info, dst_path, copied)
                 except Exception as e:
-                    print(f"    WARNING: Failed to copy {file_info['name']}: {e}")
+                    print(f"    WARNING: Failed to copy {file_path}: {e}")
         
+        close_archives()  # Every archive member has been copied
         return project_paths
 
     def generate_gitignore(self, language: str) -> str:
@@ -422,8 +586,16 @@ build/
         description = project_info['description']
         files = project_info['files']
         
-        code_files = [f for f in files if f['is_code']]
-        data_files = [f for f in files if f['is_data']]
+        # One pass over the (possibly spooled) files, keeping only the lines that list them
+        code_lines = []
+        data_lines = []
+        for file_info in files:
+            if file_info['is_code']:
+                code_lines.append(f"- `{output_path(file_info, project_info)}` - "
+                                  f"{self.detect_language(file_info['extension'])} file\n")
+            if file_info['is_data']:
+                data_lines.append(f"- `{output_path(file_info, project_info)}` - "
+                                  f"Data file ({file_info['extension']})\n")
         
         readme_content = f"""# {project_name.replace('_', ' ').title()}
 
@@ -433,21 +605,17 @@ build/
 ## Project Details
 - **Primary Language**: {language}
 - **Total Files**: {len(files)}
-- **Code Files**: {len(code_files)}
-- **Data Files**: {len(data_files)}
+- **Code Files**: {len(code_lines)}
+- **Data Files**: {len(data_lines)}
 
 ## Files in this Project
 """
         
-        if code_files:
-            readme_content += "\n### Code Files\n"
-            for file_info in code_files:
-                readme_content += f"- `{file_info['name']}` - {self.detect_language(file_info['extension'])} file\n"
+        if code_lines:
+            readme_content += "\n### Code Files\n" + ''.join(code_lines)
         
-        if data_files:
-            readme_content += "\n### Data Files\n"
-            for file_info in data_files:
-                readme_content += f"- `{file_info['name']}` - Data file ({file_info['extension']})\n"
+        if data_lines:
+            readme_content += "\n### Data Files\n" + ''.join(data_lines)
         
         readme_content += f"""
 ## Getting Started
@@ -627,34 +795,91 @@ This project is licensed under the MIT License.
             print(f"      ERROR: GitHub operation failed: {e}")
             return False
 
-    def run_full_workflow(self, input_directory: str) -> bool:
-        """Run the complete workflow"""
+    def update_project(self, project_path: str, project_name: str, project_info: Dict[str, Any]) -> bool:
+        """Commit and push the current files of a project that changed while watching"""
+        if not os.path.isdir(os.path.join(project_path, '.git')):
+            return bool(self.setup_git_and_github({project_name: project_path},
+                                                  {project_name: project_info}))
+        
+        current_dir = os.getcwd()
+        try:
+            os.chdir(project_path)
+            
+            with open('.gitignore', 'w') as f:
+                f.write(self.generate_gitignore(project_info['main_language']))
+            with open('README.md', 'w') as f:
+                f.write(self.generate_readme(project_name, project_info))
+            
+            subprocess.run(['git', 'add', '-A'], check=True, capture_output=True)
+            result = subprocess.run(['git', 'status', '--porcelain'], 
+                                  capture_output=True, text=True)
+            if not result.stdout.strip():
+                print(f"    No changes to commit")
+                return True
+            
+            subprocess.run(['git', 'commit', '-m', 'Update organized project files'], 
+                         check=True, capture_output=True)
+            print(f"    SUCCESS: Changes committed")
+            
+            if self.gh_command:
+                subprocess.run(['git', 'push', 'origin', 'main'], check=True, capture_output=True)
+                print(f"    SUCCESS: Pushed to GitHub!")
+            
+            return True
+            
+        except subprocess.CalledProcessError as e:
+            print(f"    ERROR: Git operation failed for {project_name}: {e}")
+            return False
+        except Exception as e:
+            print(f"    ERROR: Failed to update {project_name}: {e}")
+            return False
+        finally:
+            os.chdir(current_dir)
+
+    def watch_and_publish(self, input_directory: str, debounce: float = 2.0) -> bool:
+        """Publish once, then keep projects in sync with filesystem changes until interrupted"""
         print("=" * 60)
-        print("ORGANIZE AND PUBLISH - Complete Project Workflow")
+        print("ORGANIZE AND PUBLISH - Watch Mode")
         print("=" * 60)
         print(f"Input Directory: {input_directory}")
         print(f"Output Directory: {self.output_dir}")
-        print(f"GitHub Username: {self.github_username}")
         print()
         
-        # Step 1: Check prerequisites
         if not self.check_prerequisites():
             return False
         
+        walker = self.create_walker()
+        session = ProjectWatchSession(self, walker, input_directory, self.output_dir,
+                                      self.update_project)
+        session.run(debounce=debounce)
+        return True
+
+    def run_full_workflow(self, input_directory: Union[str, List[str]]) -> bool:
+        """Run the complete workflow; input_directory may also be a list of roots"""
+        input_directories = [input_directory] if isinstance(input_directory, str) else list(input_directory)
+        print("=" * 60)
+        print("ORGANIZE AND PUBLISH - Complete Project Workflow")
+        print("=" * 60)
+        print(f"Input Directory: {', '.join(input_directories)}")
+        print(f"Output Directory: {self.output_dir}")
+        print(f"GitHub Username: {self.github_username}")
         print()
         
-        # Step 2: Scan and analyze files
-        files_info = self.scan_and_analyze_files(input_directory)
-        if not files_info:
-            print("ERROR: No files found to organize")
+        # Step 1: Check prerequisites
+        if not self.check_prerequisites():
             return False
         
         print()
         
-        # Step 3: Detect projects
-        projects = self.detect_projects(files_info)
+        # Steps 2-3: Scan files and detect projects as each directory is finished
+        projects = self.detect_projects_in_roots(input_directories)
+        if self.index:
+            self.index.commit()  # Persist listings and analysis for the next run
+        if self.analysis_cache:
+            self.analysis_cache.commit()
         if not projects:
-            print("ERROR: No projects detected")
+            # Every scanned file lands in some project, so nothing detected means nothing found
+            print("ERROR: No files found to organize")
             return False
         
         print()
@@ -709,27 +934,100 @@ Examples:
         """
     )
     
-    parser.add_argument("directory", type=str, help="Directory containing files to organize")
+    parser.add_argument("directory", type=str, nargs="+",
+                       help="Directories containing files to organize (merged into one set of projects)")
     parser.add_argument("--output", type=str, default="organized_projects", 
                        help="Output directory for organized projects (default: organized_projects)")
     parser.add_argument("--github-user", type=str, default="StewartGeisz",
                        help="GitHub username (default: StewartGeisz)")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Number of threads used to traverse directories (default: 1)")
+    parser.add_argument("--processes", type=int, default=1,
+                       help="Processes that scan and analyze input roots (or their top-level "
+                            "subtrees) in parallel (default: 1)")
+    parser.add_argument("--cluster", choices=["directory", "graph"], default="directory",
+                       help="Group files by directory, or also merge projects that import or "
+                            "reference each other (default: directory)")
+    parser.add_argument("--jobs", type=int, default=1,
+                       help="Processes that analyze file contents during project detection (default: 1)")
+    parser.add_argument("--max-scan-seconds", type=float, default=None,
+                       help="Stop scanning after this many seconds and continue with partial results")
+    parser.add_argument("--max-entries", type=int, default=None,
+                       help="Stop scanning after listing this many directory entries (per shard)")
+    parser.add_argument("--checkpoint", type=str, default=None,
+                       help="Directory where scans periodically save their progress")
+    parser.add_argument("--resume", action="store_true",
+                       help="Continue the scan saved in --checkpoint instead of starting over")
+    parser.add_argument("--max-analysis-bytes", type=int, default=DEFAULT_MAX_ANALYSIS_BYTES,
+                       help="Bytes of each file examined by content analysis; 0 examines "
+                            "whole files (default: 16 MiB)")
+    parser.add_argument("--index", type=str, default=None,
+                       help="SQLite scan index reused across runs for incremental rescans")
+    parser.add_argument("--analysis-cache", type=str, default=None,
+                       help="SQLite cache of analysis results by content digest, shared across runs")
+    parser.add_argument("--analysis-cache-mb", type=int, default=DEFAULT_CACHE_BYTES // (1024 * 1024),
+                       help="Size cap of --analysis-cache; least recently used results are evicted "
+                            "(default: 256)")
+    parser.add_argument("--exclude", type=str, action="append", default=[],
+                       help="Gitignore-style glob to skip while scanning (repeatable)")
+    parser.add_argument("--no-gitignore", action="store_true",
+                       help="Do not honor .gitignore files found in the scanned tree")
+    parser.add_argument("--no-sniff", action="store_true",
+                       help="Classify files by extension only, without reading their first bytes")
+    parser.add_argument("--scan-archives", action="store_true",
+                       help="Look inside .zip/.tar archives and treat their members as files")
+    parser.add_argument("--watch", action="store_true",
+                       help="Keep running and republish projects whenever files change")
+    parser.add_argument("--debounce", type=float, default=2.0,
+                       help="Seconds of quiet before changes are processed in watch mode (default: 2)")
     
     args = parser.parse_args()
     
-    # Validate input directory
-    if not os.path.exists(args.directory):
-        print(f"ERROR: Directory does not exist: {args.directory}")
+    # Validate input directories
+    for directory in args.directory:
+        if not os.path.exists(directory):
+            print(f"ERROR: Directory does not exist: {directory}")
+            sys.exit(1)
+    if args.watch and len(args.directory) > 1:
+        print("ERROR: --watch supports a single directory")
+        sys.exit(1)
+    if args.watch and (args.max_scan_seconds or args.max_entries):
+        print("ERROR: scan budgets cannot be combined with --watch")
+        sys.exit(1)
+    if args.watch and args.cluster == 'graph':
+        print("ERROR: --cluster=graph cannot be combined with --watch")
+        sys.exit(1)
+    if args.resume and not args.checkpoint:
+        print("ERROR: --resume needs the --checkpoint directory of the earlier scan")
         sys.exit(1)
     
     # Create and run organizer
     organizer = AllInOneOrganizer(
         github_username=args.github_user,
-        output_dir=args.output
+        output_dir=args.output,
+        workers=args.workers,
+        processes=args.processes,
+        jobs=args.jobs,
+        cluster=args.cluster,
+        max_scan_seconds=args.max_scan_seconds,
+        max_entries=args.max_entries,
+        checkpoint_dir=args.checkpoint,
+        resume=args.resume,
+        max_analysis_bytes=args.max_analysis_bytes,
+        analysis_cache_path=args.analysis_cache,
+        analysis_cache_bytes=args.analysis_cache_mb * 1024 * 1024,
+        index_path=args.index,
+        exclude=args.exclude,
+        use_gitignore=not args.no_gitignore,
+        sniff_content=not args.no_sniff,
+        scan_archives=args.scan_archives
     )
     
     try:
-        success = organizer.run_full_workflow(args.directory)
+        if args.watch:
+            success = organizer.watch_and_publish(args.directory[0], debounce=args.debounce)
+        else:
+            success = organizer.run_full_workflow(args.directory)
         if success:
             sys.exit(0)
         else:
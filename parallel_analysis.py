@@ -0,0 +1,89 @@
+"""
+parallel_analysis.py
+
+Process-pool content analysis for project detection. Directory groups are
+buffered into batches; the files each batch needs analyzed are sent to a
+pool of worker processes in fixed-size chunks, and the groups are handed on
+in their original order once their batch is done, with the results waiting
+in organizer.prefetched_analyses. The next batch is already being analyzed
+while the current one is consumed, and since every file is analyzed by the
+same analyze_file_content, detection gives the same output as the serial path.
+
+Author: Stewart Geisz
+GitHub: StewartGeisz
+"""
+
+import pickle
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
+
+# Files per task sent to a worker
+CHUNK_FILES = 32
+
+# Chunks per worker collected into one batch before it is dispatched
+CHUNKS_PER_BATCH = 4
+
+# The organizer of the worker process, set once by the pool initializer
+_worker_organizer = None
+
+
+def _init_worker(state: bytes):
+    # Unpickled rather than inherited through fork, so the scan index and
+    # analysis cache open their own connections in each worker
+    global _worker_organizer
+    _worker_organizer = pickle.loads(state)
+
+
+def _analyze_chunk(paths: List[str]) -> List[Dict[str, Any]]:
+    analyses = [_worker_organizer.analyze_file_content(path) for path in paths]
+    if _worker_organizer.analysis_cache:
+        _worker_organizer.analysis_cache.commit()  # Workers exit without a final commit
+    return analyses
+
+
+def analysis_paths(dir_files: List[Dict[str, Any]]) -> List[str]:
+    """Paths analyze_project_cohesion will analyze for a directory group.
+
+    Single-file groups are not analyzed; aliases of one inode are analyzed once.
+    """
+    code_files = [f for f in dir_files if f['is_code']]
+    if len(code_files) < 2:
+        return []
+    return [f.get('alias_of') or f['path'] for f in code_files]
+
+
+def prefetch_analyses(organizer, directory_groups: Iterable[Tuple[str, List[Dict[str, Any]]]],
+                      jobs: int) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    """Yield directory_groups unchanged, with their files analyzed ahead in `jobs` processes"""
+    batch_files = jobs * CHUNK_FILES * CHUNKS_PER_BATCH
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(pickle.dumps(organizer),)) as executor:
+        in_flight = deque()
+        groups = []
+        paths = {}  # Ordered set of the batch's paths
+        for group in directory_groups:
+            groups.append(group)
+            paths.update(dict.fromkeys(analysis_paths(group[1])))
+            if len(paths) >= batch_files:
+                in_flight.append(_submit(executor, groups, list(paths)))
+                groups, paths = [], {}
+                # Keep one batch in the pool while the previous one is consumed
+                if len(in_flight) > 1:
+                    yield from _collect(organizer, *in_flight.popleft())
+        if groups:
+            in_flight.append(_submit(executor, groups, list(paths)))
+        while in_flight:
+            yield from _collect(organizer, *in_flight.popleft())
+    organizer.prefetched_analyses = {}
+
+
+def _submit(executor, groups, paths):
+    chunks = [paths[start:start + CHUNK_FILES] for start in range(0, len(paths), CHUNK_FILES)]
+    return groups, paths, [executor.submit(_analyze_chunk, chunk) for chunk in chunks]
+
+
+def _collect(organizer, groups, paths, futures):
+    results = [analysis for future in futures for analysis in future.result()]
+    organizer.prefetched_analyses = dict(zip(paths, results))
+    yield from groups
@@ -0,0 +1,78 @@
+"""
+record_spool.py
+
+Disk-backed file lists for detected projects. Project detection streams
+directory groups, but the project map it returns used to keep every file
+record of the tree until the projects were copied and documented, so peak
+memory grew with the number of files rather than with the largest
+directory. A RecordSpool appends each finished project's records to a
+temporary file, and the project map holds SpooledRecords in their place:
+small handles that iterate the records back from disk, as many times as
+the copy and README steps need.
+
+Author: Stewart Geisz
+GitHub: StewartGeisz
+"""
+
+import os
+import pickle
+import tempfile
+import weakref
+from typing import Any, Iterable, Iterator
+
+
+class RecordSpool:
+    """Append-only temporary file of pickled file records"""
+
+    def __init__(self, directory: str = None):
+        fd, self.path = tempfile.mkstemp(prefix='records-', suffix='.spool', dir=directory)
+        self.file = os.fdopen(fd, 'wb')
+        self.count = 0
+        # The file goes away with the spool even if close() is never called
+        self._finalizer = weakref.finalize(self, _remove, self.file, self.path)
+
+    def store(self, records: Iterable[Any]) -> 'SpooledRecords':
+        """Write records and return a handle that reads them back"""
+        offset = self.file.tell()
+        count = 0
+        for record in records:
+            pickle.dump(record, self.file, pickle.HIGHEST_PROTOCOL)
+            count += 1
+        self.count += count
+        return SpooledRecords(self, offset, count)
+
+    def all(self) -> 'SpooledRecords':
+        """Handle for every record stored so far"""
+        return SpooledRecords(self, 0, self.count)
+
+    def close(self):
+        self._finalizer()
+
+
+class SpooledRecords:
+    """A stored run of records; iterates like the list it replaces"""
+
+    def __init__(self, spool: RecordSpool, offset: int, count: int):
+        self.spool = spool
+        self.offset = offset
+        self.count = count
+
+    def __iter__(self) -> Iterator[Any]:
+        if not self.count:
+            return
+        self.spool.file.flush()
+        with open(self.spool.path, 'rb') as f:
+            f.seek(self.offset)
+            for _ in range(self.count):
+                yield pickle.load(f)
+
+    def __len__(self) -> int:
+        return self.count
+
+
+def _remove(file, path: str):
+    file.close()
+    try:
+        os.remove(path)
+    except OSError:
+        pass
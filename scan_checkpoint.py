@@ -0,0 +1,148 @@
+"""
+scan_checkpoint.py
+
+Checkpoint files that let an interrupted scan continue where it stopped.
+Each walk appends the directory groups it finishes to a JSON-lines file and,
+every few seconds, a line with its frontier of pending directories. A resumed
+walk replays the groups written before the last frontier line and continues
+from that frontier; anything written after it is discarded, because those
+directories are still part of the frontier.
+
+Checkpoints live in a directory, one file per walked root (or scan shard),
+whose first line names the walk it belongs to.
+
+Author: Stewart Geisz
+GitHub: StewartGeisz
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import List, Dict, Any, Optional
+
+# Seconds between two frontier lines
+CHECKPOINT_INTERVAL = 10.0
+
+
+class ScanCheckpoint:
+    def __init__(self, checkpoint_dir: str, root: str, start: str = '', recursive: bool = True,
+                 interval: float = CHECKPOINT_INTERVAL):
+        self.key = {'root': os.path.abspath(root), 'start': start, 'recursive': recursive}
+        digest = hashlib.sha1(json.dumps(self.key, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+        self.path = os.path.join(checkpoint_dir, f"scan-{digest}.jsonl")
+        self.interval = interval
+        self.file = None
+        self.last_saved = 0.0
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Read the saved state: {'groups': [(directory, rows, file ids, directory id)],
+        'frontier': [...], 'complete': bool}.
+
+        Returns None if there is no usable checkpoint for this walk.
+        """
+        try:
+            f = open(self.path, 'rb')
+        except OSError:
+            return None
+
+        groups = []
+        pending_groups = []
+        state = None
+        with f:
+            header = f.readline()
+            if _read_key(header) != self.key:
+                return None
+            offset = len(header)
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # Torn write at the end of the file
+                offset += len(line)
+                if 'group' in entry:
+                    pending_groups.append((entry['group'], entry['files'], entry['ids'],
+                                           entry.get('dir')))
+                elif 'frontier' in entry or 'complete' in entry:
+                    groups.extend(pending_groups)
+                    pending_groups = []
+                    state = {'frontier': entry.get('frontier', []),
+                             'complete': 'complete' in entry, 'offset': offset}
+
+        if state is None:
+            return None
+        state['groups'] = groups
+        return state
+
+    def open(self, state: Optional[Dict[str, Any]] = None):
+        """Start writing: continue after a loaded state, or begin a new checkpoint"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        if state is None:
+            self.file = open(self.path, 'w', encoding='utf-8')
+            self._write({'checkpoint': self.key})
+        else:
+            # Drop what was written after the last frontier line
+            with open(self.path, 'r+b') as f:
+                f.truncate(state['offset'])
+            self.file = open(self.path, 'a', encoding='utf-8')
+        self.last_saved = time.monotonic()
+
+    def add_group(self, directory: str, rows: List[List[Any]], file_ids: List[Optional[List[int]]],
+                  dir_id: Optional[List[int]] = None):
+        """Record a finished directory group; file_ids and dir_id keep aliasing intact on resume"""
+        self._write({'group': directory, 'files': rows, 'ids': file_ids, 'dir': dir_id})
+
+    def maybe_save_frontier(self, frontier: List[str]):
+        """Save the frontier if the checkpoint interval has passed"""
+        if time.monotonic() - self.last_saved >= self.interval:
+            self.save_frontier(frontier)
+
+    def save_frontier(self, frontier: List[str]):
+        """Make everything written so far durable, with the directories still to scan"""
+        self._write({'frontier': frontier}, sync=True)
+        self.last_saved = time.monotonic()
+
+    def mark_complete(self):
+        self._write({'complete': True}, sync=True)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def _write(self, entry: Dict[str, Any], sync: bool = False):
+        self.file.write(json.dumps(entry) + '\n')
+        if sync:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+
+def _read_key(header: bytes) -> Optional[Dict[str, Any]]:
+    """The walk a checkpoint belongs to, from its first line"""
+    try:
+        return json.loads(header)['checkpoint']
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+def clear_checkpoints(checkpoint_dir: str, roots: List[str]):
+    """Remove the checkpoints of finished scans of roots (and their shards) from checkpoint_dir.
+
+    Checkpoints of other roots sharing the directory are left alone.
+    """
+    roots = {os.path.abspath(root) for root in roots}
+    try:
+        names = os.listdir(checkpoint_dir)
+    except OSError:
+        return
+    for name in names:
+        if not (name.startswith('scan-') and name.endswith('.jsonl')):
+            continue
+        path = os.path.join(checkpoint_dir, name)
+        try:
+            with open(path, 'rb') as f:
+                key = _read_key(f.readline())
+            if key is not None and key.get('root') in roots:
+                os.remove(path)
+        except OSError:
+            pass
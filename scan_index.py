@@ -0,0 +1,141 @@
+"""
+scan_index.py
+
+Persistent SQLite index that lets repeated runs over a mostly unchanged tree
+skip work. Directory listings are stored with the directory's mtime, so an
+unchanged directory is not listed again on rescan; the walker still stats its
+files, since editing a file in place leaves the directory's mtime alone, and
+only sniffs the changed ones again. Each file's analyze_file_content results
+are stored with its size, mtime and inode and the analysis version (see
+content_analysis.analysis_version), so only files whose metadata changed,
+or that were analyzed differently, are analyzed again.
+
+Author: Stewart Geisz
+GitHub: StewartGeisz
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+# Directories modified this recently are not cached: a change landing in the
+# same mtime tick as the scan would otherwise go unnoticed on the next run
+MTIME_SETTLE_SECONDS = 2
+
+
+class ScanIndex:
+    def __init__(self, index_path: str, autocommit: bool = False):
+        self.index_path = index_path
+        self.lock = threading.Lock()
+        # Set if another process still holds the write lock after the busy timeout; reads continue
+        self.read_only = False
+        # Shared by the traversal threads; every access goes through self.lock.
+        # With autocommit each insert is its own short transaction, so processes
+        # writing to the same index only ever wait for a single row.
+        self.connection = sqlite3.connect(index_path, check_same_thread=False,
+                                          isolation_level=None if autocommit else '')
+        # WAL lets readers proceed while another process writes
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS directories (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                listing TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                analysis TEXT,
+                analysis_version TEXT
+            );
+        """)
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(files)")]
+        if 'analysis_version' not in columns:
+            # Index from before versioned analyses: its rows never match a version
+            self.connection.execute("ALTER TABLE files ADD COLUMN analysis_version TEXT")
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Sent to shard processes by path; each one opens its own connection
+        return {'index_path': self.index_path}
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__init__(state['index_path'], autocommit=True)
+
+    def _write(self, statement: str, parameters: Tuple):
+        """Run an insert; the index is only a cache, so a busy database skips it"""
+        if self.read_only:
+            return
+        with self.lock:
+            try:
+                self.connection.execute(statement, parameters)
+            except sqlite3.OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+                self.read_only = True
+
+    def get_listing(self, dir_path: str, dir_stat: os.stat_result) -> Optional[Dict[str, Any]]:
+        """Return the cached listing of a directory if no entry was added, removed or renamed.
+
+        The per-file size, mtime and inode are as they were when stored; the
+        caller checks them against the files themselves.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT mtime_ns, listing FROM directories WHERE path = ?", (dir_path,)
+            ).fetchone()
+        if row is None or row[0] != dir_stat.st_mtime_ns:
+            return None
+        return json.loads(row[1])
+
+    def put_listing(self, dir_path: str, dir_stat: os.stat_result,
+                    files: List[Tuple[str, int, int, int, int, Optional[str], Optional[str]]],
+                    subdirs: List[str]):
+        """Store a directory listing: files as (name, size, mtime_ns, inode, link count,
+        content type, extension hint) plus subdirectory names"""
+        if time.time() - dir_stat.st_mtime < MTIME_SETTLE_SECONDS:
+            return
+        listing = json.dumps({'files': files, 'subdirs': subdirs})
+        self._write(
+            "INSERT OR REPLACE INTO directories (path, mtime_ns, listing) VALUES (?, ?, ?)",
+            (dir_path, dir_stat.st_mtime_ns, listing)
+        )
+
+    def get_analysis(self, file_path: str, file_stat: os.stat_result,
+                     version: str) -> Optional[Dict[str, Any]]:
+        """Return stored analysis results if the file's size, mtime and inode are unchanged
+        and they were computed by the same analysis version"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT size, mtime_ns, inode, analysis, analysis_version FROM files WHERE path = ?",
+                (file_path,)
+            ).fetchone()
+        if row is None or row[3] is None or row[4] != version:
+            return None
+        if (row[0], row[1], row[2]) != (file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino):
+            return None
+        return json.loads(row[3])
+
+    def put_analysis(self, file_path: str, file_stat: os.stat_result, version: str,
+                     analysis: Dict[str, Any]):
+        """Store analysis results together with the metadata and version they were computed from"""
+        self._write(
+            "INSERT OR REPLACE INTO files (path, size, mtime_ns, inode, analysis, analysis_version) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (file_path, file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino,
+             json.dumps(analysis), version)
+        )
+
+    def commit(self):
+        with self.lock:
+            self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self.connection.commit()
+            self.connection.close()
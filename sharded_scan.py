@@ -0,0 +1,105 @@
+"""
+sharded_scan.py
+
+Multi-root project detection for the organizers. The input roots are split
+into shards (one per root when running in a single process, otherwise one per
+top-level subtree so a single large root does not end up on one core), each
+shard is scanned and analyzed in its own process,
+and the per-shard project maps are merged back in walk order, so the result
+matches scanning the roots one after another.
+
+Author: Stewart Geisz
+GitHub: StewartGeisz
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+# (root index, root path, relative directory to start at, walk below it)
+Shard = Tuple[int, str, str, bool]
+
+
+def plan_shards(walker, roots: List[str], processes: int) -> List[Shard]:
+    """Split the roots into shards, in the order a serial walk would visit them"""
+    if processes <= 1:
+        return [(index, root, '', True) for index, root in enumerate(roots)]
+
+    shards = []
+    for index, root in enumerate(roots):
+        # The root's own files, then each subtree the walker would enter
+        shards.append((index, root, '', False))
+        prefix = root if root.endswith(os.sep) else root + os.sep
+        node = (root, '', 0, walker.ignore, frozenset())
+        subdirs = walker._scan_directory(node, prefix)[1]
+        shards.extend((index, root, relative_dir, True) for _, relative_dir in subdirs)
+    return shards
+
+
+def detect_shard(organizer, shard: Shard) -> Tuple[Dict[str, Any], Optional[List[str]]]:
+    """Scan and analyze one shard; runs in a worker process.
+
+    Returns the shard's projects and, if its scan budget ran out, the
+    relative directories it skipped.
+    """
+    _, root, start, recursive = shard
+    walker = organizer.create_walker()
+    projects = organizer.detect_projects_from_groups(walker.walk_groups(root, start, recursive),
+                                                     verbose=False)
+    if organizer.index:
+        organizer.index.commit()
+    if organizer.analysis_cache:
+        organizer.analysis_cache.commit()
+    return projects, walker.skipped_subtrees if walker.truncated else None
+
+
+def merge_projects(results: List[Tuple[int, Dict[str, Any]]]) -> Dict[str, Any]:
+    """Merge per-shard project maps.
+
+    Within one root a later project replaces an earlier one of the same name,
+    as in a single detect_projects run; the same name under another root gets
+    a numeric suffix instead. Miscellaneous files are collected into one project.
+    """
+    merged = {}
+    owners = {}  # project name -> root index
+    misc_files = []
+
+    for root_index, projects in results:
+        for name, info in projects.items():
+            if name == 'misc':
+                misc_files.extend(info['files'])
+                continue
+            if name in owners and owners[name] != root_index:
+                suffix = 2
+                while f"{name}_{suffix}" in owners and owners[f"{name}_{suffix}"] != root_index:
+                    suffix += 1
+                name = f"{name}_{suffix}"
+            owners[name] = root_index
+            merged[name] = info
+
+    if misc_files:
+        merged['misc'] = {
+            'files': misc_files,
+            'main_language': 'mixed',
+            'description': 'Miscellaneous files that don\'t belong to specific projects',
+            'directory': 'misc'
+        }
+    return merged
+
+
+def detect_projects_sharded(organizer, roots: List[str], processes: int) -> Dict[str, Any]:
+    """Detect projects across several roots with up to `processes` worker processes"""
+    planner = organizer.create_walker()
+    planner.max_entries = planner.deadline = None  # Listing the roots is not charged to the budget
+    shards = plan_shards(planner, roots, processes)
+
+    if processes <= 1:
+        results = [detect_shard(organizer, shard) for shard in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(detect_shard, [organizer] * len(shards), shards))
+
+    for shard, (_, skipped) in zip(shards, results):
+        if skipped is not None:
+            organizer.record_truncation(shard[1], skipped)
+    return merge_projects([(shard[0], projects) for shard, (projects, _) in zip(shards, results)])
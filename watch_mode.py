@@ -0,0 +1,435 @@
+"""
+watch_mode.py
+
+Long-running watch mode for the project organizers. Subscribes to filesystem
+change events (inotify through ctypes on Linux, periodic polling elsewhere),
+debounces them, and re-runs project detection only for the directory groups
+that changed instead of rescanning and re-copying the whole tree. Only the
+directories the walker would enter are watched; if inotify runs out of
+watches anyway, the session warns and switches to polling.
+
+Author: Stewart Geisz
+GitHub: StewartGeisz
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import shutil
+import struct
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, Any, Optional, Set, Callable, Tuple
+
+from archive_reader import is_archive
+from file_scanner import DirectoryWalker, copy_file_record
+
+# inotify event masks (see <sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+              IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+EVENT_HEADER = struct.Struct('iIII')
+
+# Returned instead of a set of directories when events were lost
+RESCAN_ALL = None
+
+
+class WatchLimitReached(OSError):
+    """inotify ran out of watches (fs.inotify.max_user_watches)"""
+
+
+class _WatchedTree:
+    """The directories of a tree the walker would enter, with the same skip and ignore rules"""
+
+    def __init__(self, root: str, walker: DirectoryWalker):
+        self.root = root
+        self.walker = walker
+        self.prefix = root if root.endswith(os.sep) else root + os.sep
+
+    def relative(self, dir_path: str) -> str:
+        return '' if dir_path.rstrip(os.sep) == self.root.rstrip(os.sep) else dir_path[len(self.prefix):]
+
+    def matcher_for(self, dir_path: str):
+        """Ignore rules in effect inside a directory, or None if the walker skips it"""
+        return self.walker._matcher_for(self.root, self.relative(dir_path))
+
+    def subdirectories(self, dir_path: str, matcher, entries) -> Tuple[Any, Set[str]]:
+        """Rules for the children of a directory, and which of its entries are entered"""
+        if self.walker.use_gitignore and any(entry.name == '.gitignore' for entry in entries):
+            matcher = matcher.extend(self.relative(dir_path), os.path.join(dir_path, '.gitignore'))
+        entered = set()
+        for entry in entries:
+            if (entry.is_dir(follow_symlinks=False) and entry.name not in self.walker.skip_dirs
+                    and not matcher.is_ignored(entry.path[len(self.prefix):], True)):
+                entered.add(entry.path)
+        return matcher, entered
+
+
+class InotifyWatcher:
+    """Recursive inotify watch on a directory tree.
+
+    Subtrees the walker skips or ignores are not watched, so build output and
+    virtualenvs do not use up the watch budget. Raises WatchLimitReached when
+    the budget is exhausted anyway, rather than silently missing changes.
+    """
+
+    def __init__(self, root: str, walker: DirectoryWalker):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.tree = _WatchedTree(root, walker)
+        self.watches = {}  # watch descriptor -> directory path
+        try:
+            self.add_tree(root)
+        except WatchLimitReached:
+            self.close()
+            raise
+
+    def add_tree(self, directory_path: str) -> Set[str]:
+        """Watch a directory and everything below it, returning the directories added"""
+        added = set()
+        matcher = self.tree.matcher_for(directory_path)
+        if matcher is None:
+            return added
+        stack = [(directory_path, matcher)]
+        while stack:
+            dir_path, matcher = stack.pop()
+            wd = self._add_watch(self.fd, os.fsencode(dir_path), WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error == errno.ENOSPC:
+                    raise WatchLimitReached(error, f"inotify watch limit reached at {dir_path} "
+                                                   "(see fs.inotify.max_user_watches)")
+                continue  # Vanished or unreadable; a later event will report it
+            self.watches[wd] = dir_path
+            added.add(dir_path)
+            try:
+                with os.scandir(dir_path) as entries:
+                    matcher, entered = self.tree.subdirectories(dir_path, matcher, list(entries))
+            except OSError:
+                continue
+            stack.extend((subdir, matcher) for subdir in entered)
+        return added
+
+    def read_changes(self, timeout: float) -> Optional[Set[str]]:
+        """Wait up to timeout seconds and return the directories whose contents changed"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, name_length = EVENT_HEADER.unpack_from(buffer, offset)
+            name = buffer[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + name_length]
+            name = os.fsdecode(name.rstrip(b'\0'))
+            offset += EVENT_HEADER.size + name_length
+
+            if mask & IN_Q_OVERFLOW:
+                return RESCAN_ALL
+
+            dir_path = self.watches.get(wd)
+            if dir_path is None:
+                continue
+            if mask & IN_IGNORED:
+                del self.watches[wd]
+                continue
+
+            changed.add(dir_path)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # New subtree: watch it and treat all of its directories as changed
+                changed |= self.add_tree(os.path.join(dir_path, name))
+            elif mask & IN_ISDIR and mask & (IN_DELETE | IN_MOVED_FROM):
+                changed.add(os.path.join(dir_path, name))
+
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback watcher that compares directory snapshots at a fixed interval"""
+
+    def __init__(self, root: str, walker: DirectoryWalker, interval: float = 5.0):
+        self.root = root
+        self.tree = _WatchedTree(root, walker)
+        self.interval = interval
+        self.snapshot = self._take_snapshot()
+
+    def _take_snapshot(self) -> Dict[str, Any]:
+        """Map each directory to the (name, size, mtime) of its files"""
+        snapshot = {}
+        stack = [(self.root, self.tree.matcher_for(self.root))]
+        while stack:
+            dir_path, matcher = stack.pop()
+            signature = []
+            try:
+                with os.scandir(dir_path) as scanned:
+                    entries = list(scanned)
+            except OSError:
+                continue
+            matcher, entered = self.tree.subdirectories(dir_path, matcher, entries)
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path in entered:
+                        stack.append((entry.path, matcher))
+                        signature.append((entry.name, -1, 0))
+                    continue
+                try:
+                    entry_stat = entry.stat()
+                    signature.append((entry.name, entry_stat.st_size, entry_stat.st_mtime_ns))
+                except OSError:
+                    signature.append((entry.name, 0, 0))
+            snapshot[dir_path] = frozenset(signature)
+        return snapshot
+
+    def read_changes(self, timeout: float) -> Optional[Set[str]]:
+        time.sleep(min(timeout, self.interval))
+        current = self._take_snapshot()
+        changed = {path for path in current.keys() | self.snapshot.keys()
+                   if current.get(path) != self.snapshot.get(path)}
+        self.snapshot = current
+        return changed
+
+    def close(self):
+        pass
+
+
+def create_watcher(root: str, walker: DirectoryWalker, poll_interval: float = 5.0):
+    """Return an inotify watcher when the platform supports it, otherwise a polling one"""
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(root, walker)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}), falling back to polling")
+    return PollingWatcher(root, walker, poll_interval)
+
+
+def wait_for_changes(watcher, debounce: float) -> Optional[Set[str]]:
+    """Block until something changes, then collect events until debounce seconds pass quietly"""
+    changed = set()
+    while not changed:
+        changed = watcher.read_changes(timeout=3600)
+        if changed is RESCAN_ALL:
+            return RESCAN_ALL
+
+    while True:
+        more = watcher.read_changes(timeout=debounce)
+        if more is RESCAN_ALL:
+            return RESCAN_ALL
+        if not more:
+            return changed
+        changed |= more
+
+
+class ProjectWatchSession:
+    """Keeps the detected projects of a directory tree in sync with the filesystem.
+
+    The organizer provides detect_projects(); publish_project(path, name, info)
+    is called after a project's files are copied and should write README /
+    .gitignore and commit. Only directory groups that changed are re-detected.
+    """
+
+    def __init__(self, organizer, walker: DirectoryWalker, input_directory: str,
+                 output_directory: str, publish_project: Callable[[str, str, Dict[str, Any]], bool]):
+        self.organizer = organizer
+        self.walker = walker
+        self.input_directory = input_directory
+        self.output_directory = output_directory
+        self.publish_project = publish_project
+        self.prefix = input_directory if input_directory.endswith(os.sep) else input_directory + os.sep
+
+        self.groups = {}  # relative directory -> file records
+        self.projects_by_directory = {}  # relative directory -> {project name: project info}
+        self.projects = {}
+
+    def initial_sync(self):
+        """Scan the whole tree once and publish every detected project"""
+        self.groups = dict(self.walker.walk_groups(self.input_directory))
+
+        # One detection pass over everything, then remember which directory each project came from
+        self.projects_by_directory = defaultdict(dict)
+        for name, info in self.organizer.detect_projects(
+                [f for files in self.groups.values() for f in files]).items():
+            if name == 'misc':
+                for file_info in info['files']:
+                    misc = self.projects_by_directory[file_info['directory']].setdefault(
+                        'misc', {'files': []})
+                    misc['files'].append(file_info)
+            else:
+                self.projects_by_directory[info['directory']][name] = info
+        self.projects_by_directory = dict(self.projects_by_directory)
+
+        self._sync(set(self._merge_projects()) | set(self.projects))
+
+    def run(self, debounce: float = 2.0, poll_interval: float = 5.0):
+        """Watch until interrupted, re-detecting projects in changed directories.
+
+        The organizer's index and analysis cache are closed when the session ends.
+        """
+        watcher = None
+        try:
+            self.initial_sync()
+            watcher = create_watcher(self.input_directory, self.walker, poll_interval)
+            print(f"Watching {self.input_directory} for changes (Ctrl+C to stop)")
+            while True:
+                try:
+                    changed = wait_for_changes(watcher, debounce)
+                except WatchLimitReached as e:
+                    # A new subtree could not be watched; from here on, poll instead
+                    print(f"{e}, falling back to polling")
+                    watcher.close()
+                    watcher = PollingWatcher(self.input_directory, self.walker, poll_interval)
+                    changed = RESCAN_ALL
+                if changed is RESCAN_ALL:
+                    print("Event queue overflowed or watches were lost, rescanning everything")
+                    old_names = set(self.projects)
+                    self.projects_by_directory = {}
+                    self.initial_sync()
+                    self._sync(old_names - set(self.projects))
+                    continue
+                self.refresh({self._relative(path) for path in changed})
+        finally:
+            if watcher is not None:
+                watcher.close()
+            for store in (self.organizer.index, self.organizer.analysis_cache):
+                if store:
+                    store.close()
+
+    def refresh(self, changed_dirs: Set[str]):
+        """Re-detect projects for the given relative directories and publish what changed"""
+        print(f"Changes detected in {len(changed_dirs)} directories")
+        affected = set()
+        for directory in changed_dirs:
+            for name in self.projects_by_directory.pop(directory, {}):
+                affected.add(name)
+
+            files = self.walker.scan_group(self.input_directory, directory)
+            if self.walker.scan_archives:
+                # The directory's archives are re-read in full; their old virtual groups go away
+                nested = directory + os.sep if directory else ''
+                for stale in [d for d in self.groups
+                              if d.startswith(nested) and is_archive(d[len(nested):].split(os.sep)[0])
+                              and not os.path.isdir(os.path.join(self.input_directory, d))]:
+                    self.groups.pop(stale)
+                    affected.update(self.projects_by_directory.pop(stale, {}))
+                files, archive_groups = self.walker.expand_archives(files, self.walker.ignore,
+                                                                    self.prefix)
+                for archive_dir, archive_files in archive_groups:
+                    self.groups[archive_dir] = archive_files
+                    self.projects_by_directory[archive_dir] = self._detect_group(archive_dir)
+                    affected.update(self.projects_by_directory[archive_dir])
+
+            if files:
+                self.groups[directory] = files
+                self.projects_by_directory[directory] = self._detect_group(directory)
+                affected.update(self.projects_by_directory[directory])
+            else:
+                self.groups.pop(directory, None)
+                if not os.path.isdir(os.path.join(self.input_directory, directory)):
+                    # Directory moved away or deleted: forget everything below it too
+                    nested = directory + os.sep if directory else ''
+                    for stale in [d for d in self.groups if d.startswith(nested)]:
+                        self.groups.pop(stale)
+                        affected.update(self.projects_by_directory.pop(stale, {}))
+
+        self._sync(affected)
+
+    def _relative(self, dir_path: str) -> str:
+        return '' if dir_path.rstrip(os.sep) == self.input_directory.rstrip(os.sep) \
+            else dir_path[len(self.prefix):]
+
+    def _detect_group(self, directory: str) -> Dict[str, Any]:
+        return self.organizer.detect_projects(self.groups[directory])
+
+    def _merge_projects(self) -> Dict[str, Any]:
+        """Combine per-directory results the way a full detect_projects run would"""
+        merged = {}
+        misc_files = []
+        for directory in self.groups:
+            for name, info in self.projects_by_directory.get(directory, {}).items():
+                if name == 'misc':
+                    misc_files.extend(info['files'])
+                else:
+                    merged[name] = info
+        if misc_files:
+            merged['misc'] = {
+                'files': misc_files,
+                'main_language': 'mixed',
+                'description': 'Miscellaneous files that don\'t belong to specific projects',
+                'directory': 'misc'
+            }
+        return merged
+
+    def _commit_stores(self):
+        """Persist what detection stored, and release the write lock, before publishing"""
+        for store in (self.organizer.index, self.organizer.analysis_cache):
+            if store:
+                store.commit()
+
+    def _sync(self, affected: Set[str]):
+        """Rewrite the output folders of the affected projects and publish them"""
+        self.projects = self._merge_projects()
+        self._commit_stores()
+        current_dir = os.getcwd()
+        copied = {}
+
+        for name in sorted(affected):
+            project_dir = os.path.join(self.output_directory, name)
+            info = self.projects.get(name)
+
+            if info is None:
+                if os.path.isdir(project_dir):
+                    print(f"  Removing project: {name}")
+                    shutil.rmtree(project_dir, ignore_errors=True)
+                continue
+
+            print(f"  Updating project: {name}")
+            os.makedirs(project_dir, exist_ok=True)
+            # Clear out stale files but keep the repository history
+            for entry in os.listdir(project_dir):
+                if entry == '.git':
+                    continue
+                entry_path = os.path.join(project_dir, entry)
+                if os.path.isdir(entry_path):
+                    shutil.rmtree(entry_path, ignore_errors=True)
+                else:
+                    os.remove(entry_path)
+
+            for file_info in info['files']:
+                try:
+                    copy_file_record(file_info, os.path.join(project_dir, file_info['name']), copied)
+                except Exception as e:
+                    print(f"    Failed to copy {file_info['name']}: {e}")
+
+            try:
+                self.publish_project(os.path.abspath(project_dir), name, info)
+            finally:
+                os.chdir(current_dir)